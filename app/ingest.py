@@ -0,0 +1,132 @@
+import csv
+import io
+import json
+from decimal import Decimal
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from .parcel.parcel import ParcelGroupMeta
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Large shipments spend more time being validated line by line than packed.
+# These parse the compact formats accepted by `POST /vehicle_size/columnar`,
+# validating each column at once rather than each `ParcelRequest`, and build a
+# single `ParcelGroupMeta` per distinct line without validating it again.
+
+# Columns of a shipment, one value per `ParcelRequest` line
+DIMENSION_COLUMNS = ("length", "width", "height", "weight")
+COLUMNS = DIMENSION_COLUMNS + ("quantity",)
+
+
+class IngestError(ValueError):
+    """Raised when a shipment body is malformed or fails validation."""
+    pass
+
+
+def _loads(body: bytes):
+    # orjson is several times faster than the standard library, when present
+    if orjson is not None:
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError as e:
+            raise IngestError("Invalid JSON: %s" % e)
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise IngestError("Invalid JSON: %s" % e)
+
+
+def parse_columnar_json(body: bytes) -> List[ParcelGroupMeta]:
+    """Parses a shipment sent as one list per column, for example
+    `{"length": [20, 1], "width": [20, 1], "height": [30, 1],
+    "weight": [60, 5], "quantity": [1, 3]}`. Values may be numbers or
+    numeric strings."""
+    data = _loads(body)
+    if not isinstance(data, dict):
+        raise IngestError("Body must be an object of columns")
+    return _to_parcels(data)
+
+
+def parse_csv(body: bytes) -> List[ParcelGroupMeta]:
+    """Parses a shipment sent as CSV, with a header row naming the columns
+    in any order, then one line per `ParcelRequest`."""
+    try:
+        rows = csv.reader(io.StringIO(body.decode("utf-8-sig")))
+        header = next(rows, None)
+        if header is None:
+            raise IngestError("Missing header row")
+        lines = [row for row in rows if row]
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise IngestError("Invalid CSV: %s" % e)
+    header = [name.strip() for name in header]
+    if any(len(row) != len(header) for row in lines):
+        raise IngestError("Every line must have %d values" % len(header))
+    # Transpose into columns, the values stay strings
+    columns = dict(zip(header, zip(*lines))) if lines else {
+        name: () for name in header}
+    return _to_parcels(columns)
+
+
+def _to_parcels(columns: Dict[str, Sequence]) -> List[ParcelGroupMeta]:
+    missing = [name for name in COLUMNS if name not in columns]
+    if missing:
+        raise IngestError("Missing columns: %s" % ", ".join(missing))
+    unknown = [name for name in columns if name not in COLUMNS]
+    if unknown:
+        raise IngestError("Unknown columns: %s" % ", ".join(unknown))
+    lengths = set()
+    for name in COLUMNS:
+        if not isinstance(columns[name], (list, tuple)):
+            raise IngestError("Column %s must be a list" % name)
+        lengths.add(len(columns[name]))
+    if len(lengths) > 1:
+        raise IngestError("Columns must all have the same length")
+    if not lengths.pop():
+        raise IngestError("Must provide at least one Parcel")
+
+    for name in DIMENSION_COLUMNS:
+        _check_positive(name, _as_array(name, columns[name], float))
+    _check_positive("quantity", _as_array("quantity", columns["quantity"],
+                                          np.int64))
+
+    # Identical lines share a `ParcelGroupMeta`, the columns were checked
+    # above so the records are built as is
+    quantities: Dict[tuple, int] = {}
+    lines = zip(*(columns[name] for name in DIMENSION_COLUMNS))
+    for line, quantity in zip(lines, columns["quantity"]):
+        quantities[line] = quantities.get(line, 0) + int(quantity)
+    return [ParcelGroupMeta.construct(
+                *(_to_decimal(value) for value in line), quantity=quantity)
+            for line, quantity in quantities.items()]
+
+
+def _as_array(name: str, column: Sequence, dtype) -> np.ndarray:
+    try:
+        values = np.asarray(column)
+        # Strings are parsed by `astype`, but booleans aren't numbers (even
+        # among numbers, which numpy turns into 1s), floats would be truncated
+        # to integers and nested lists aren't single values
+        if values.ndim != 1 or values.dtype.kind == "b" or (
+                dtype is np.int64 and values.dtype.kind == "f") or any(
+                isinstance(value, bool) for value in column):
+            raise TypeError
+        return values.astype(dtype)
+    except (TypeError, ValueError, OverflowError):
+        raise IngestError("Column %s must hold %s" % (
+            name, "integers" if dtype is np.int64 else "numbers"))
+
+
+def _check_positive(name: str, values: np.ndarray) -> None:
+    if not (np.isfinite(values) & (values > 0)).all():
+        raise IngestError("Column %s must be greater than 0" % name)
+
+
+def _to_decimal(value) -> Decimal:
+    # Like pydantic, goes through str so that 0.1 stays 0.1
+    return Decimal(value if isinstance(value, (int, str)) else str(value))
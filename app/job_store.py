@@ -0,0 +1,235 @@
+import abc
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from .jobs import JOB_FINAL_STATES, Job, JobStatus
+
+
+class JobStore(abc.ABC):
+    """Interface for storing `Job`s.
+
+    Stores are bounded: `Job`s in one of the `JOB_FINAL_STATES` are evicted
+    once they are older than `ttl` seconds, or when more than `max_size` `Job`s
+    are stored, least recently used first. Running `Job`s are never evicted.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 3600):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @abc.abstractmethod
+    def get(self, job_id: str) -> Optional[Job]:
+        """Returns the `Job`, or None if it does not exist or was evicted."""
+        pass
+
+    @abc.abstractmethod
+    def put(self, job: Job) -> None:
+        """Adds or updates the `Job`."""
+        pass
+
+    @abc.abstractmethod
+    def delete(self, job_id: str) -> None:
+        """Removes the `Job` if it exists."""
+        pass
+
+    @abc.abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def stats(self) -> Dict[str, int]:
+        """Returns metrics for monitoring the store."""
+        return {"size": len(self), "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions}
+
+
+class MemoryJobStore(JobStore):
+    """Stores `Job`s in memory. `Job`s are lost whenever the server restarts
+    and are not shared between uvicorn workers.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 3600):
+        super().__init__(max_size, ttl)
+        self._jobs: Dict[str, Job] = {}
+        # Finished job_ids ordered by the time they finished, for TTL eviction
+        self._finished: OrderedDict = OrderedDict()
+        # Finished job_ids ordered by last access, for LRU eviction. Running
+        # jobs are left out since they are never evicted
+        self._lru: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._evict_expired()
+            job = self._jobs.get(job_id)
+            if job is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if job_id in self._lru:
+                self._lru.move_to_end(job_id)
+            return job
+
+    def put(self, job: Job) -> None:
+        with self._lock:
+            self._jobs[job.job_id] = job
+            if job.status in JOB_FINAL_STATES:
+                if job.job_id not in self._finished:
+                    self._finished[job.job_id] = time.monotonic()
+                self._lru[job.job_id] = None
+                self._lru.move_to_end(job.job_id)
+            self._evict_expired()
+            self._evict_overflow()
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            self._finished.pop(job_id, None)
+            self._lru.pop(job_id, None)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def _remove(self, job_id: str) -> None:
+        del self._jobs[job_id]
+        del self._finished[job_id]
+        del self._lru[job_id]
+        self.evictions += 1
+
+    def _evict_expired(self) -> None:
+        cutoff = time.monotonic() - self.ttl
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if finished_at > cutoff:
+                break
+            self._remove(job_id)
+
+    def _evict_overflow(self) -> None:
+        # Running jobs are skipped, there are at most as many as the
+        # `JobRunner` allows to be queued
+        while len(self._jobs) > self.max_size and self._lru:
+            job_id, _ = self._lru.popitem(last=False)
+            del self._jobs[job_id]
+            del self._finished[job_id]
+            self.evictions += 1
+
+
+class SQLiteJobStore(JobStore):
+    """Stores `Job`s in a SQLite database, so that results survive restarts
+    and can be shared across uvicorn workers on the same machine.
+
+    `Job` results and stats must be JSON serializable. Hit and miss counts
+    are tracked per process.
+    """
+
+    def __init__(self, path: str, max_size: int = 10000, ttl: float = 3600):
+        super().__init__(max_size, ttl)
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY,"
+                " status INTEGER NOT NULL,"
+                " result TEXT,"
+                " progress TEXT NOT NULL,"
+                " finished_at REAL,"
+                " accessed_at REAL NOT NULL,"
+                " stats TEXT)"
+            )
+            columns = [row[1] for row in
+                       conn.execute("PRAGMA table_info(jobs)")]
+            if "stats" not in columns:
+                # Created before `Job`s had stats
+                conn.execute("ALTER TABLE jobs ADD COLUMN stats TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_accessed_at"
+                         " ON jobs (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._connect() as conn:
+            self._evict_expired(conn)
+            row = conn.execute(
+                "SELECT status, result, progress, stats FROM jobs"
+                " WHERE job_id = ?",
+                (job_id,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE jobs SET accessed_at = ? WHERE job_id = ?",
+                         (time.time(), job_id))
+        self.hits += 1
+        job = Job(job_id)
+        job.status = JobStatus(row[0])
+        job.result = json.loads(row[1]) if row[1] is not None else None
+        job.progress = json.loads(row[2])
+        job.stats = json.loads(row[3]) if row[3] is not None else None
+        return job
+
+    def put(self, job: Job) -> None:
+        now = time.time()
+        finished_at = now if job.status in JOB_FINAL_STATES else None
+        result = json.dumps(job.result) if job.result is not None else None
+        stats = json.dumps(job.stats) if job.stats is not None else None
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs"
+                " (job_id, status, result, progress, finished_at, accessed_at,"
+                " stats)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job.job_id, int(job.status), result,
+                 json.dumps(job.progress), finished_at, now, stats))
+            self._evict_expired(conn)
+            self._evict_overflow(conn)
+
+    def delete(self, job_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def _evict_expired(self, conn: sqlite3.Connection) -> None:
+        cursor = conn.execute("DELETE FROM jobs WHERE finished_at < ?",
+                              (time.time() - self.ttl,))
+        self.evictions += cursor.rowcount
+
+    def _evict_overflow(self, conn: sqlite3.Connection) -> None:
+        overflow = len(self) - self.max_size
+        if overflow <= 0:
+            return
+        cursor = conn.execute(
+            "DELETE FROM jobs WHERE job_id IN ("
+            " SELECT job_id FROM jobs WHERE finished_at IS NOT NULL"
+            " ORDER BY accessed_at LIMIT ?)", (overflow,))
+        self.evictions += cursor.rowcount
+
+
+def create_job_store(url: str, max_size: int = 10000,
+                     ttl: float = 3600) -> JobStore:
+    """Creates a `JobStore` from a url, either `memory` or
+    `sqlite:///<path>`.
+    """
+    if url == "memory":
+        return MemoryJobStore(max_size=max_size, ttl=ttl)
+    if url.startswith("sqlite:///"):
+        return SQLiteJobStore(url[len("sqlite:///"):], max_size=max_size,
+                              ttl=ttl)
+    raise ValueError("Unsupported job store: %s" % url)
@@ -0,0 +1,244 @@
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from enum import IntEnum
+from typing import Callable, Dict, List, Optional
+
+
+# Ideally, we would move job tracking to Redis or some other persistent data
+# store. For the sake of the project timeline, we track jobs either in memory
+# or in a local SQLite database (see `job_store.py`). In memory, jobs are lost
+# whenever the server crashes or reboots. Either way, finished jobs are purged
+# after a while to keep the size of our job tracker bounded.
+#
+# FastAPI recommends Celery with Redis or RabbitMQ for heavy background
+# computation. Until then, `Job`s are run in a local pool of worker processes
+# so that packing never blocks the event loop serving the API.
+
+# uses uuid4
+JOB_ID_REGEX = (
+    r"^[a-f0-9]{8}-?[a-f0-9]{4}-?4[a-f0-9]{3}-?[89ab][a-f0-9]{3}-?[a-f0-9]{12}\Z"
+)
+
+
+class JobStatus(IntEnum):
+    FAILED = -1
+    RUNNING = 0
+    COMPLETE = 1
+
+
+JOB_FINAL_STATES = [JobStatus.FAILED, JobStatus.COMPLETE]
+
+
+class Job:
+    """Metadata for tracking background `Job`s"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.status = JobStatus.RUNNING
+        self.result = None
+        # Partial results reported while the `Job` is running
+        self.progress: List[Dict] = []
+        # Timers and counters reported by the `Job`, see `report_stats`
+        self.stats: Optional[Dict] = None
+
+
+def new_job_id() -> str:
+    """Returns unique job_id"""
+    return str(uuid.uuid4())
+
+
+class QueueFullError(Exception):
+    """Exception thrown when the `JobRunner` cannot accept any more `Job`s."""
+    pass
+
+
+# Set in worker processes by `_init_worker`
+_progress_queue = None
+_current_job_id = None
+_progress_count = 0
+_job_stats = None
+
+
+def _init_worker(progress_queue) -> None:
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def _run_job(job_id: str, func: Callable, args, kwargs):
+    """Runs `func` in a worker process on behalf of a `Job`. Returns its
+    result along with the number of progress events and the stats it
+    reported."""
+    global _current_job_id, _progress_count, _job_stats
+    _current_job_id, _progress_count, _job_stats = job_id, 0, None
+    try:
+        return func(*args, **kwargs), _progress_count, _job_stats
+    finally:
+        _current_job_id = _job_stats = None
+
+
+def report_progress(event: Dict) -> None:
+    """Reports a partial result for the `Job` running in this worker. Does
+    nothing when called outside of a `JobRunner` worker."""
+    global _progress_count
+    if _progress_queue is None or _current_job_id is None:
+        return
+    _progress_queue.put((_current_job_id, event))
+    _progress_count += 1
+
+
+def report_stats(stats: Dict) -> None:
+    """Attaches stats to the `Job` running in this worker, once it finishes.
+    Does nothing when called outside of a `JobRunner` worker."""
+    global _job_stats
+    if _current_job_id is not None:
+        _job_stats = stats
+
+
+class JobRunner:
+    """Runs `Job`s in a bounded pool of worker processes.
+
+    Packing is CPU-bound, so running it on the event loop would stall every
+    other request. Instead, each `Job` is handed to a `ProcessPoolExecutor`
+    and its status is updated once the worker finishes. At most `max_queue`
+    `Job`s may be queued or running at once, after which `submit` raises a
+    `QueueFullError`.
+
+    Workers may call `report_progress` to append partial results to their
+    `Job`, and `report_stats` to attach stats to it. `on_progress` is called
+    with the `Job` after each one, and `on_finish` once its status has been
+    updated.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None,
+                 max_queue: int = 100,
+                 on_finish: Optional[Callable[[Job], None]] = None,
+                 on_progress: Optional[Callable[[Job], None]] = None):
+        if max_queue < 1:
+            raise ValueError("max_queue must be at least 1")
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.on_finish = on_finish
+        self.on_progress = on_progress
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        # Running jobs by job_id, for attaching progress events
+        self._running: Dict[str, Job] = {}
+        self._progress_queue = None
+        self._progress_received = threading.Condition()
+
+    @property
+    def pending(self) -> int:
+        """Number of `Job`s that are queued or running."""
+        return self._pending
+
+    @property
+    def available(self) -> int:
+        """Number of `Job`s that can still be submitted."""
+        return max(self.max_queue - self._pending, 0)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Workers are started lazily so that importing the app is cheap
+        if self._executor is None:
+            if self._progress_queue is None:
+                # Unlike `multiprocessing.Queue`, `put` writes straight to the
+                # pipe, so all events are sent before the `Job`'s result
+                self._progress_queue = multiprocessing.SimpleQueue()
+                threading.Thread(target=self._receive_progress,
+                                 args=(self._progress_queue,),
+                                 daemon=True).start()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, initializer=_init_worker,
+                initargs=(self._progress_queue,))
+        return self._executor
+
+    def _receive_progress(self, progress_queue) -> None:
+        while True:
+            item = progress_queue.get()
+            if item is None:
+                return
+            job_id, event = item
+            with self._progress_received:
+                job = self._running.get(job_id)
+                if job is not None:
+                    job.progress.append(event)
+                    # Still holding the lock, so that this can't overwrite the
+                    # `Job`'s final status
+                    if self.on_progress is not None:
+                        self.on_progress(job)
+                self._progress_received.notify_all()
+
+    def submit(self, job: Job, func: Callable, *args, **kwargs) -> Future:
+        """Runs `func` in a worker process, storing its return value or error
+        on the `Job` once it finishes. `func` and its arguments must be
+        picklable.
+
+        Returns a `Future` for the result of `func`, which completes once the
+        `Job` has been updated.
+        """
+        with self._lock:
+            if self._pending >= self.max_queue:
+                raise QueueFullError(
+                    "Job queue is full (%d pending)" % self._pending)
+            self._pending += 1
+            self._running[job.job_id] = job
+            try:
+                try:
+                    future = self._get_executor().submit(
+                        _run_job, job.job_id, func, args, kwargs)
+                except BrokenProcessPool:
+                    # A worker died unexpectedly, start over with a new pool
+                    self._executor = None
+                    future = self._get_executor().submit(
+                        _run_job, job.job_id, func, args, kwargs)
+            except Exception:
+                self._pending -= 1
+                del self._running[job.job_id]
+                raise
+        job_future = Future()
+        future.add_done_callback(lambda f: self._finish(job, f, job_future))
+        return job_future
+
+    def _finish(self, job: Job, future: Future, job_future: Future) -> None:
+        if future.cancelled():
+            job.result = {"error": "Job was cancelled"}
+            job.status = JobStatus.FAILED
+        elif future.exception() is not None:
+            job.result = {"error": str(future.exception())}
+            job.status = JobStatus.FAILED
+        else:
+            result, progress_count, job.stats = future.result()
+            # Make sure all of the `Job`'s progress was recorded before its
+            # final status
+            with self._progress_received:
+                self._progress_received.wait_for(
+                    lambda: len(job.progress) >= progress_count, timeout=1)
+            job.result = result
+            job.status = JobStatus.COMPLETE
+        with self._lock:
+            self._pending -= 1
+            self._running.pop(job.job_id, None)
+        if self.on_finish is not None:
+            self.on_finish(job)
+
+        if future.cancelled():
+            job_future.cancel()
+        elif future.exception() is not None:
+            job_future.set_exception(future.exception())
+        else:
+            job_future.set_result(job.result)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops all worker processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            progress_queue, self._progress_queue = self._progress_queue, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+        if progress_queue is not None:
+            # Stops the progress thread
+            progress_queue.put(None)
@@ -1,70 +1,102 @@
-import uuid
+import asyncio
+import json
+import multiprocessing.util
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
 from decimal import Decimal
-from enum import IntEnum
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
 from pydantic import BaseModel
-from fastapi import BackgroundTasks, FastAPI, HTTPException, Path, Query
+from fastapi import FastAPI, Header, HTTPException, Path, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
-from .parcel import packer
-from .parcel.parcel import ParcelMeta
+from . import ingest
+from .job_store import create_job_store
+from .jobs import (JOB_FINAL_STATES, JOB_ID_REGEX, Job, JobRunner,
+                   QueueFullError, new_job_id, report_progress, report_stats)
+from .jobs import JobStatus  # noqa: F401 (re-exported for the tests)
+from .metrics import PackingMetrics
+from .parcel import fleet, packer, stats
+from .parcel.cache import MISSING, create_result_cache, shipment_key
+from .parcel.container import CONTAINER_TYPES_BY_SIZE, ContainerMeta
+from .parcel.parcel import ParcelGroupMeta, ParcelMeta
+from .parcel.speculative import SpeculativePacker
 
 
 ########
 # Jobs #
 ########
 
-# Ideally, we would move job tracking to Redis or some other persistent data
-# store. For the sake of the project timeline, we track jobs in memory. This
-# means that jobs are lost whenever the server crashes or reboots.
-# Additionally, jobs are not automatically purged, meaning the size of our job
-# tracker will grow indefinitely.
-#
-# FastAPI recommends Celery with Redis or RabbitMQ for heavy background
-# computation.
+# Number of worker processes used for packing, defaults to the CPU count
+PACKING_MAX_WORKERS = int(os.environ.get("PACKING_MAX_WORKERS", 0)) or None
+# Number of `Job`s that may be queued or running before we reject new ones
+PACKING_MAX_QUEUE = int(os.environ.get("PACKING_MAX_QUEUE", 100))
 
-# uses uuid4
-JOB_ID_REGEX = (
-    r"^[a-f0-9]{8}-?[a-f0-9]{4}-?4[a-f0-9]{3}-?[89ab][a-f0-9]{3}-?[a-f0-9]{12}\Z"
-)
+# Either `memory` or `sqlite:///<path>`, use SQLite to keep jobs across
+# restarts or to share them between uvicorn workers
+JOB_STORE = os.environ.get("JOB_STORE", "memory")
+# Maximum number of jobs to keep, finished jobs are evicted first
+JOB_STORE_MAX_SIZE = int(os.environ.get("JOB_STORE_MAX_SIZE", 10000))
+# Number of seconds to keep finished jobs around for
+JOB_STORE_TTL = float(os.environ.get("JOB_STORE_TTL", 3600))
 
+job_store = create_job_store(JOB_STORE, max_size=JOB_STORE_MAX_SIZE,
+                             ttl=JOB_STORE_TTL)
 
-class JobStatus(IntEnum):
-    FAILED = -1
-    RUNNING = 0
-    COMPLETE = 1
+metrics = PackingMetrics()
 
 
-JOB_FINAL_STATES = [JobStatus.FAILED, JobStatus.COMPLETE]
+def _on_finish(job: Job) -> None:
+    job_store.put(job)
+    metrics.record(job)
 
 
-class Job:
-    """Metadata for tracking background `Job`s"""
+runner = JobRunner(max_workers=PACKING_MAX_WORKERS,
+                   max_queue=PACKING_MAX_QUEUE,
+                   on_finish=_on_finish,
+                   on_progress=job_store.put)
 
-    def __init__(self, job_id):
-        self.status = JobStatus.RUNNING
-        self.result = None
 
+def dispatch_job(job_id, func, *args, **kwargs) -> Future:
+    """Dispatches function to `Job` queue. Raises a 503 if the queue is
+    saturated."""
+    job = Job(job_id)
+    job_store.put(job)
+    try:
+        return runner.submit(job, func, *args, **kwargs)
+    except QueueFullError as e:
+        job_store.delete(job_id)
+        raise HTTPException(status_code=503, detail=str(e),
+                            headers={"Retry-After": "1"})
 
-jobs: Dict[str, Job] = {}
 
+###########
+# Results #
+###########
 
-def new_job_id() -> str:
-    """Returns unique job_id"""
-    return str(uuid.uuid4())
+# Either `memory` or `sqlite:///<path>`, use SQLite to keep results across
+# restarts or to share them between uvicorn workers
+RESULT_CACHE = os.environ.get("RESULT_CACHE", "memory")
+# Number of shipment results to cache, repeat shipments are answered
+# immediately without dispatching a job
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", 1024))
 
+result_cache = create_result_cache(RESULT_CACHE, CONTAINER_TYPES_BY_SIZE,
+                                   max_size=RESULT_CACHE_SIZE)
 
-async def dispatch_job(job_id, func, *args, **kwargs) -> None:
-    """Dispatches function to `Job` queue"""
-    job = Job(job_id)
-    jobs[job_id] = job
-    try:
-        job.result = func(*args, **kwargs)
-    except Exception as e:
-        job.status = JobStatus.FAILED
-        job.result = {"error": str(e)}
-        return
-    job.status = JobStatus.COMPLETE
+
+def _cache_result(key: str, future: Future) -> None:
+    """Stores the result of a finished vehicle size `Job` in the cache."""
+    if not future.cancelled() and future.exception() is None:
+        result = future.result()
+        # Best-effort results are only good enough for the request that
+        # asked for them
+        if result.get("proven", True):
+            result_cache.put(key, result["vehicle_size"])
 
 
 #######
@@ -74,6 +106,11 @@ async def dispatch_job(job_id, func, *args, **kwargs) -> None:
 app = FastAPI()
 
 
+@app.on_event("shutdown")
+def shutdown_runner():
+    runner.shutdown(wait=False)
+
+
 class ParcelRequest(BaseModel):
     """Meta class for receiving `Parcel` data and their quantities"""
     length: Decimal = Query(..., gt=0)
@@ -83,40 +120,469 @@ class ParcelRequest(BaseModel):
     quantity: int = Query(..., gt=0)
 
 
-def _get_vehicle_size(parcels: List[ParcelMeta]):
+def _report_verdict(container: ContainerMeta, fits: bool) -> None:
+    """Reports whether the parcels fit in `container` as `Job` progress."""
+    report_progress({"vehicle_size": container.name, "fits": fits})
+
+
+# Shipments with up to this many parcels are packed to make sure they fit,
+# larger ones are only checked by volume
+ADVANCED_PACKING_MAX_PARCELS = int(
+    os.environ.get("ADVANCED_PACKING_MAX_PARCELS", 1000))
+
+
+def _use_advanced_packing(parcels: List[ParcelGroupMeta]) -> bool:
+    return sum(p.quantity for p in parcels) <= ADVANCED_PACKING_MAX_PARCELS
+
+
+# Number of extra processes each packing worker uses to pack candidate
+# `Container`s concurrently, 0 packs them one after the other
+SPECULATIVE_PACKING_WORKERS = int(
+    os.environ.get("SPECULATIVE_PACKING_WORKERS", 0))
+
+# Created lazily in each packing worker, see `_speculative_packer`
+_speculative = None
+
+
+def _speculative_packer() -> Optional[SpeculativePacker]:
+    global _speculative
+    if SPECULATIVE_PACKING_WORKERS and _speculative is None:
+        _speculative = SpeculativePacker(SPECULATIVE_PACKING_WORKERS)
+        # Stops its processes as the packing worker exits, once the
+        # `JobRunner` shuts down. Runs ahead of the finalizers closing the
+        # executor's queues, which use a priority of 10.
+        multiprocessing.util.Finalize(None, _speculative.shutdown,
+                                      exitpriority=100)
+    return _speculative
+
+
+# Whether `Job`s record per-stage timers and counters, see `parcel.stats`
+PACKING_STATS = os.environ.get("PACKING_STATS", "1").lower() not in (
+    "0", "false", "no")
+
+
+@contextmanager
+def _job_stats():
+    """Collects stats for the packing done within the block and attaches
+    them to the running `Job`."""
+    if not PACKING_STATS:
+        yield
+        return
+    with stats.collect() as collected:
+        yield
+    report_stats(collected.as_dict())
+
+
+def _get_vehicle_size(parcels: List[ParcelMeta], advanced_packing: bool,
+                      deadline: Optional[float] = None):
     """Retrieves smallest needed `Container` to transport parcels and returns
-    result for `Job`."""
-    container = packer.smallest_needed_container(parcels)
+    result for `Job`.
+
+    With a `deadline`, the result also says whether it is `proven`, or only
+    an unverified guess from the cheap checks."""
+    with _job_stats():
+        container, proven = packer.size_shipment(
+            parcels, advanced_packing=advanced_packing,
+            on_verdict=_report_verdict, speculative=_speculative_packer(),
+            deadline=deadline)
     name = container.name if container else None
-    return {"vehicle_size": name}
+    if deadline is None:
+        return {"vehicle_size": name}
+    return {"vehicle_size": name, "proven": proven}
+
+
+def _to_parcels(parcel_list: List[ParcelRequest]) -> List[ParcelGroupMeta]:
+    """Converts a shipment's `ParcelRequest`s to `ParcelGroupMeta`s."""
+    # Keep one record per request line rather than one per unit, so the cost
+    # of the request scales with the number of SKUs and not their quantities
+    return [
+        ParcelGroupMeta(
+            length=parcel_request.length,
+            width=parcel_request.width,
+            height=parcel_request.height,
+            weight=parcel_request.weight,
+            quantity=parcel_request.quantity,
+        )
+        for parcel_request in parcel_list
+    ]
+
+
+def _shipment_key(parcels: List[ParcelGroupMeta]) -> str:
+    return shipment_key(parcels, _use_advanced_packing(parcels))
+
+
+# `Job`s sizing a shipment without a deadline that are still running, by
+# shipment key, so that identical shipments share them
+_in_flight: Dict[str, Tuple[str, Future]] = {}
+_in_flight_lock = threading.Lock()
+# Number of requests that were attached to a running `Job`
+coalesced_requests = 0
+
+
+def _finish_in_flight(key: str, job_id: str) -> None:
+    with _in_flight_lock:
+        if _in_flight.get(key, (None,))[0] == job_id:
+            del _in_flight[key]
+
+
+def _dispatch_vehicle_size(key: str, parcels: List[ParcelGroupMeta],
+                           deadline: Optional[float] = None
+                           ) -> Tuple[str, Future]:
+    """Dispatches a `Job` to size the shipment, caching its result under
+    `key` once it completes.
+
+    Without a `deadline`, a `Job` already running for the same shipment is
+    returned instead of dispatching another. With one, results may not be
+    proven, so those `Job`s are never shared."""
+    global coalesced_requests
+    if deadline is None:
+        with _in_flight_lock:
+            if key in _in_flight:
+                coalesced_requests += 1
+                return _in_flight[key]
+    job_id = new_job_id()
+    future = dispatch_job(job_id, _get_vehicle_size, parcels,
+                          _use_advanced_packing(parcels), deadline)
+    if deadline is None:
+        with _in_flight_lock:
+            _in_flight[key] = (job_id, future)
+    # Callbacks run in order, so the result is cached before the `Job` stops
+    # being shared
+    future.add_done_callback(lambda f: _cache_result(key, f))
+    if deadline is None:
+        future.add_done_callback(lambda f: _finish_in_flight(key, job_id))
+    return job_id, future
+
+
+# Idempotency keys sent with `POST /vehicle_size`, mapped to the shipment key
+# and `job_id` of the request that first used them. Kept for as many `Job`s as
+# the `job_store`, as the `job_id` is of no use once its `Job` is evicted.
+# Unlike `Job`s in a SQLite `job_store`, keys are only known to this process.
+_idempotency_keys: OrderedDict = OrderedDict()
+_idempotency_lock = threading.Lock()
+# Longest idempotency key we accept
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+
+def _idempotent_job(idempotency_key: str, key: str) -> Optional[str]:
+    """Returns the `job_id` of the `Job` dispatched for an earlier request
+    with the same `idempotency_key`, if it is still around. Raises a 422 if
+    that request was for a different shipment."""
+    with _idempotency_lock:
+        entry = _idempotency_keys.get(idempotency_key)
+    if entry is None:
+        return None
+    shipment, job_id = entry
+    if shipment != key:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used for another shipment")
+    if job_store.get(job_id) is None:
+        return None
+    return job_id
+
+
+def _remember_idempotency_key(idempotency_key: str, key: str,
+                              job_id: str) -> None:
+    with _idempotency_lock:
+        _idempotency_keys[idempotency_key] = (key, job_id)
+        _idempotency_keys.move_to_end(idempotency_key)
+        while len(_idempotency_keys) > JOB_STORE_MAX_SIZE:
+            _idempotency_keys.popitem(last=False)
+
+
+# Longest a client may ask us to wait for a result before falling back to a
+# `Job`
+MAX_WAIT_MS = 10000
+# Longest a client may give us to size a shipment with `deadline_ms`
+MAX_DEADLINE_MS = 60000
+
+
+async def _wait_for_result(future: Future, wait_ms: int):
+    """Waits up to `wait_ms` for the `Job`'s result. Returns None if it did
+    not complete successfully in time, the `Job` keeps running either way."""
+    try:
+        # Shield the job from being cancelled when we stop waiting on it
+        return await asyncio.wait_for(
+            asyncio.shield(asyncio.wrap_future(future)), wait_ms / 1000)
+    except Exception:
+        # Timed out or failed, the client can poll the `Job` for details
+        return None
 
 
 @app.post("/vehicle_size")
 async def vehicle_size(parcel_list: List[ParcelRequest],
-                       background_tasks: BackgroundTasks) -> Dict:
+                       wait_ms: int = Query(0, ge=0, le=MAX_WAIT_MS),
+                       deadline_ms: Optional[int] = Query(
+                           None, ge=1, le=MAX_DEADLINE_MS),
+                       idempotency_key: Optional[str] = Header(
+                           None, max_length=MAX_IDEMPOTENCY_KEY_LENGTH)
+                       ) -> Dict:
     """Dispatches a `Job` to find the smallest possible vehicle to fit the
-    provided list of `Parcel`s."""
-    parcels = []
-    for parcel_request in parcel_list:
-        for i in range(parcel_request.quantity):
-            parcel = ParcelMeta(
-                length=parcel_request.length,
-                width=parcel_request.width,
-                height=parcel_request.height,
-                weight=parcel_request.weight,
-            )
-            parcels.append(parcel)
+    provided list of `Parcel`s. If the same shipment was sized recently, the
+    result is returned directly instead, and if it is being sized right now,
+    the request shares that `Job`.
+
+    Retries sending the same `Idempotency-Key` header get the `job_id` of the
+    first request, as long as its `Job` is still around.
+
+    With `wait_ms`, the result is also returned directly if the `Job`
+    completes within that many milliseconds.
+
+    With `deadline_ms`, packing stops that many milliseconds after the
+    request was received. The result then says whether the vehicle size is
+    `proven`, or only an unverified guess from the cheap checks."""
+    deadline = _deadline(deadline_ms)
+    return await _vehicle_size(_to_parcels(parcel_list), wait_ms, deadline,
+                               idempotency_key)
+
+
+def _deadline(deadline_ms: Optional[int]) -> Optional[float]:
+    if deadline_ms is None:
+        return None
+    # The monotonic clock is shared by every process on the machine, so the
+    # deadline holds in the packing workers too
+    return time.monotonic() + deadline_ms / 1000
+
+
+async def _vehicle_size(parcels: List[ParcelGroupMeta], wait_ms: int,
+                        deadline: Optional[float],
+                        idempotency_key: Optional[str]) -> Dict:
+    """Sizes a shipment for `POST /vehicle_size`, whichever format it was
+    sent in."""
+    key = _shipment_key(parcels)
+    if idempotency_key is not None:
+        job_id = _idempotent_job(idempotency_key, key)
+        if job_id is not None:
+            return {"job_id": job_id}
+
+    name = result_cache.get(key)
+    if name is not MISSING:
+        if deadline is None:
+            return {"vehicle_size": name}
+        return {"vehicle_size": name, "proven": True}
+
+    job_id, future = _dispatch_vehicle_size(key, parcels, deadline)
+    if idempotency_key is not None:
+        _remember_idempotency_key(idempotency_key, key, job_id)
+    if wait_ms:
+        result = await _wait_for_result(future, wait_ms)
+        if result is not None:
+            return result
+    return {"job_id": job_id}
+
+
+# Parsers for the bodies accepted by `POST /vehicle_size/columnar`, by media
+# type
+COLUMNAR_PARSERS = {
+    "application/json": ingest.parse_columnar_json,
+    "text/csv": ingest.parse_csv,
+}
+
+
+@app.post("/vehicle_size/columnar")
+async def vehicle_size_columnar(request: Request,
+                                wait_ms: int = Query(0, ge=0, le=MAX_WAIT_MS),
+                                deadline_ms: Optional[int] = Query(
+                                    None, ge=1, le=MAX_DEADLINE_MS),
+                                idempotency_key: Optional[str] = Header(
+                                    None,
+                                    max_length=MAX_IDEMPOTENCY_KEY_LENGTH)
+                                ) -> Dict:
+    """Same as `POST /vehicle_size`, for large shipments sent in a compact
+    format: either a JSON object with one list per column, or CSV with a
+    header row. The body is validated a column at a time rather than a
+    `ParcelRequest` at a time, which is much faster for long lists."""
+    deadline = _deadline(deadline_ms)
+    media_type = request.headers.get("content-type", "application/json")
+    parse = COLUMNAR_PARSERS.get(media_type.split(";")[0].strip().lower())
+    if parse is None:
+        raise HTTPException(
+            status_code=415,
+            detail="Content-Type must be one of: %s" % ", ".join(
+                COLUMNAR_PARSERS))
+    try:
+        parcels = parse(await request.body())
+    except ingest.IngestError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return await _vehicle_size(parcels, wait_ms, deadline, idempotency_key)
+
+
+@app.post("/vehicle_size/batch")
+async def vehicle_size_batch(shipments: List[List[ParcelRequest]],
+                             wait_ms: int = Query(0, ge=0, le=MAX_WAIT_MS)
+                             ) -> Dict:
+    """Sizes many shipments at once. Returns one entry per shipment, in the
+    same order, with either its result or the `job_id` to poll for it.
+
+    Cached shipments are answered directly and identical shipments within the
+    batch share a single `Job`. The batch is rejected as a whole if there is
+    not enough room in the queue for all of its `Job`s."""
+    results: List[Dict] = [None] * len(shipments)
+    # Shipments that need a `Job`, by key
+    uncached: Dict[str, Tuple[List[ParcelGroupMeta], List[int]]] = {}
+    for i, parcel_list in enumerate(shipments):
+        parcels = _to_parcels(parcel_list)
+        key = _shipment_key(parcels)
+        name = result_cache.get(key)
+        if name is not MISSING:
+            results[i] = {"vehicle_size": name}
+        elif key in uncached:
+            uncached[key][1].append(i)
+        else:
+            uncached[key] = (parcels, [i])
 
+    if len(uncached) > runner.available:
+        raise HTTPException(
+            status_code=503,
+            detail="Job queue cannot fit %d more jobs" % len(uncached),
+            headers={"Retry-After": "1"})
+
+    dispatched = []
+    for key, (parcels, indices) in uncached.items():
+        job_id, future = _dispatch_vehicle_size(key, parcels)
+        dispatched.append((job_id, future, indices))
+
+    if wait_ms and dispatched:
+        # Jobs are not cancelled when the wait times out. Failed `Job`s are
+        # reported when polled, so gathering their exceptions keeps asyncio
+        # from logging them as never retrieved
+        await asyncio.wait([asyncio.gather(asyncio.wrap_future(future),
+                                           return_exceptions=True)
+                            for _, future, _ in dispatched],
+                           timeout=wait_ms / 1000)
+
+    for job_id, future, indices in dispatched:
+        if (future.done() and not future.cancelled()
+                and future.exception() is None):
+            result = future.result()
+        else:
+            result = {"job_id": job_id}
+        for i in indices:
+            results[i] = result
+    return {"results": results}
+
+
+def _parcel_dicts(parcels: List[ParcelGroupMeta]) -> List[Dict]:
+    """Formats `Parcel`s as they are sent to us, so they can be stored as
+    JSON and sent back as is."""
+    return [{"length": float(p.length), "width": float(p.width),
+             "height": float(p.height), "weight": float(p.weight),
+             "quantity": p.quantity}
+            for p in parcels]
+
+
+# Largest shipment, in parcels, `POST /fleet` plans for. Planning packs each
+# parcel in turn, so its time and memory grow with the number of parcels.
+FLEET_MAX_PARCELS = int(os.environ.get("FLEET_MAX_PARCELS", 20000))
+
+
+def _plan_fleet(parcels: List[ParcelGroupMeta]) -> Dict:
+    """Plans the vehicles needed to carry the parcels and returns result for
+    `Job`."""
+    with _job_stats():
+        plan = fleet.plan_fleet(parcels)
+    return {
+        "vehicles": [{"vehicle_size": vehicle.container.name,
+                      "parcels": _parcel_dicts(vehicle.parcels)}
+                     for vehicle in plan.vehicles],
+        "total_cost": float(plan.cost),
+        "unassigned": _parcel_dicts(plan.unassigned),
+    }
+
+
+@app.post("/fleet")
+async def fleet_plan(parcel_list: List[ParcelRequest],
+                     wait_ms: int = Query(0, ge=0, le=MAX_WAIT_MS)) -> Dict:
+    """Dispatches a `Job` to find the cheapest mix of vehicles that together
+    carry the provided list of `Parcel`s, for shipments too large for a
+    single vehicle.
+
+    With `wait_ms`, the result is returned directly if the `Job` completes
+    within that many milliseconds."""
+    parcels = _to_parcels(parcel_list)
+    if sum(p.quantity for p in parcels) > FLEET_MAX_PARCELS:
+        raise HTTPException(
+            status_code=422,
+            detail="Fleets are planned for at most %d parcels"
+                   % FLEET_MAX_PARCELS)
     job_id = new_job_id()
-    background_tasks.add_task(dispatch_job, job_id, _get_vehicle_size, parcels)
+    future = dispatch_job(job_id, _plan_fleet, parcels)
+    if wait_ms:
+        result = await _wait_for_result(future, wait_ms)
+        if result is not None:
+            return result
     return {"job_id": job_id}
 
 
 @app.get("/job/{job_id}")
-async def job_status(job_id: str = Path(..., regex=JOB_ID_REGEX)):
-    """Retrieves the specified `Job` from the queue."""
-    if job_id not in jobs:
+async def job_status(job_id: str = Path(..., regex=JOB_ID_REGEX),
+                     include_stats: bool = False):
+    """Retrieves the specified `Job` from the queue.
+
+    With `include_stats`, the response also includes the time the `Job` spent
+    per packing stage and counts of the work it did, once it has finished."""
+    job = job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
-    job = jobs[job_id]
-    return {"job_id": job_id, "job_status": job.status,
-            "job_result": job.result}
+    response = {"job_id": job_id, "job_status": job.status,
+                "job_result": job.result}
+    if include_stats:
+        response["job_stats"] = job.stats
+    return response
+
+
+# Seconds between checks for updates to a streamed `Job`
+STREAM_POLL_INTERVAL = 0.05
+
+
+@app.get("/job/{job_id}/stream")
+async def job_stream(job_id: str = Path(..., regex=JOB_ID_REGEX)):
+    """Streams updates to the specified `Job` as newline delimited JSON, until
+    it completes or fails. Each line is either a progress event or a change
+    in status, the last line includes the `Job`'s result."""
+    if job_store.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def updates():
+        status = None
+        progress_sent = 0
+        while True:
+            job = job_store.get(job_id)
+            if job is None:
+                # Evicted while we were streaming it
+                return
+            for event in job.progress[progress_sent:]:
+                yield json.dumps({"job_id": job_id, "progress": event}) + "\n"
+            progress_sent = len(job.progress)
+            if job.status != status:
+                status = job.status
+                update = {"job_id": job_id, "job_status": status}
+                if status in JOB_FINAL_STATES:
+                    update["job_result"] = job.result
+                yield json.dumps(update) + "\n"
+            if status in JOB_FINAL_STATES:
+                return
+            await asyncio.sleep(STREAM_POLL_INTERVAL)
+
+    return StreamingResponse(updates(), media_type="application/x-ndjson")
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def packing_metrics():
+    """Exposes packing stats aggregated over finished `Job`s, along with the
+    state of the queue and caches, for Prometheus to scrape."""
+    store = job_store.stats()
+    return PlainTextResponse(
+        metrics.render(
+            gauges={"packing_jobs_pending": runner.pending,
+                    "job_store_size": store["size"],
+                    "result_cache_size": len(result_cache)},
+            counters={"job_store_hits_total": store["hits"],
+                      "job_store_misses_total": store["misses"],
+                      "job_store_evictions_total": store["evictions"],
+                      "result_cache_hits_total": result_cache.hits,
+                      "result_cache_misses_total": result_cache.misses,
+                      "packing_requests_coalesced_total":
+                          coalesced_requests}),
+        media_type="text/plain; version=0.0.4")
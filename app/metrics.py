@@ -0,0 +1,77 @@
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+from .jobs import Job, JobStatus
+
+
+# Metrics are aggregated per process, so with several uvicorn workers each one
+# reports its own. Prometheus sums them up across scrape targets.
+
+
+class PackingMetrics:
+    """Aggregates the stats of finished `Job`s, see `parcel.stats`."""
+
+    def __init__(self):
+        self.jobs: Dict[str, int] = Counter()
+        self.stage_seconds: Dict[str, float] = defaultdict(float)
+        self.counters: Dict[str, int] = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, job: Job) -> None:
+        """Adds a finished `Job` and its stats, if any, to the totals."""
+        with self._lock:
+            self.jobs[JobStatus(job.status).name.lower()] += 1
+            if not job.stats:
+                return
+            for stage, ms in job.stats.get("timers_ms", {}).items():
+                self.stage_seconds[stage] += ms / 1000
+            for name, n in job.stats.get("counters", {}).items():
+                self.counters[name] += n
+
+    def render(self, gauges: Dict[str, float],
+               counters: Optional[Dict[str, float]] = None) -> str:
+        """Returns the totals, along with `gauges` and `counters` sampled by
+        the caller, in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            _add_metric(lines, "packing_jobs_total", "counter",
+                        "Finished packing jobs by status.",
+                        {("status", status): n
+                         for status, n in sorted(self.jobs.items())})
+            _add_metric(lines, "packing_stage_seconds_total", "counter",
+                        "Time spent per packing stage.",
+                        {("stage", stage): seconds for stage, seconds
+                         in sorted(self.stage_seconds.items())})
+            _add_metric(lines, "packing_events_total", "counter",
+                        "Work done while packing, such as the orientations "
+                        "tried or the layers and strips built.",
+                        {("event", name): n
+                         for name, n in sorted(self.counters.items())})
+        for name, value in gauges.items():
+            _add_metric(lines, name, "gauge", None, {None: value})
+        for name, value in (counters or {}).items():
+            _add_metric(lines, name, "counter", None, {None: value})
+        return "\n".join(lines) + "\n"
+
+
+def _add_metric(lines: List[str], name: str, kind: str, help_text, samples
+                ) -> None:
+    if help_text is not None:
+        lines.append("# HELP %s %s" % (name, help_text))
+    lines.append("# TYPE %s %s" % (name, kind))
+    for label, value in samples.items():
+        if label is None:
+            lines.append("%s %s" % (name, _format_value(value)))
+        else:
+            lines.append('%s{%s="%s"} %s' % (
+                name, label[0], _escape(label[1]), _format_value(value)))
+
+
+def _escape(value: str) -> str:
+    return (value.replace("\\", "\\\\").replace('"', '\\"')
+            .replace("\n", "\\n"))
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,74 @@
+from typing import Dict, List
+
+from .parcel import ParcelMeta
+
+
+class Box:
+    """Internal representation of a `Parcel` in a fixed orientation, with its
+    dimensions in integer `units`. The packing engines only ever compare and
+    sum these ints, `ParcelMeta`s are only used at the boundary.
+
+    Each `Box` is created along with its rotated twin, so trying another
+    orientation is a lookup rather than building a new record. `Box`es are
+    immutable, so identical `Parcel`s share the same pair.
+    """
+    __slots__ = ('length', 'width', 'height', 'volume', 'parcel', 'turned',
+                 'is_turned')
+
+    def __init__(self, length: int, width: int, height: int, volume: int,
+                 parcel: ParcelMeta, is_turned: bool = False):
+        self.length = length
+        self.width = width
+        self.height = height
+        self.volume = volume
+        self.parcel = parcel
+        self.is_turned = is_turned
+        self.turned = self
+
+    @classmethod
+    def from_parcel(cls, parcel: ParcelMeta) -> 'Box':
+        l, w, h = parcel.dims
+        box = cls(l, w, h, parcel.volume_units, parcel)
+        if l != w:
+            # Square footprints look the same either way
+            box.turned = cls(w, l, h, parcel.volume_units, parcel, True)
+            box.turned.turned = box
+        return box
+
+    def rotated(self) -> 'Box':
+        """Returns the `Box` turned 90 degrees, keeping it upright."""
+        return self.turned
+
+    def to_parcel(self) -> ParcelMeta:
+        """Returns the `ParcelMeta` in this `Box`'s orientation."""
+        parcel = self.parcel
+        if not self.is_turned:
+            return parcel
+        return ParcelMeta(parcel.width, parcel.length, parcel.height,
+                          parcel.weight)
+
+
+def to_boxes(parcels: List[ParcelMeta]) -> List[Box]:
+    """Converts `Parcel`s to `Box`es, reusing the `Box` for repeats of the
+    same `ParcelMeta` such as those from `ParcelGroupMeta.expand`."""
+    boxes_by_parcel: Dict[int, Box] = {}
+    boxes = []
+    for parcel in parcels:
+        box = boxes_by_parcel.get(id(parcel))
+        if box is None:
+            box = boxes_by_parcel[id(parcel)] = Box.from_parcel(parcel)
+        boxes.append(box)
+    return boxes
+
+
+def to_parcels(boxes: List[Box]) -> List[ParcelMeta]:
+    """Converts `Box`es back to `Parcel`s, only building a new `ParcelMeta`
+    once per distinct rotated `Box`."""
+    parcels_by_box: Dict[int, ParcelMeta] = {}
+    parcels = []
+    for box in boxes:
+        parcel = parcels_by_box.get(id(box))
+        if parcel is None:
+            parcel = parcels_by_box[id(box)] = box.to_parcel()
+        parcels.append(parcel)
+    return parcels
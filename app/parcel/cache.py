@@ -0,0 +1,186 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from decimal import Context
+from collections import Counter, OrderedDict
+from typing import Hashable, List, Optional
+
+from .container import ContainerMeta
+from .parcel import ParcelMeta, group_parcels
+
+# Returned by `ResultCache.get` on a miss, as None is a valid cached result
+MISSING = object()
+
+# Normalizing with the global context would round away digits beyond its
+# precision, making distinct shipments share a key
+_KEY_CONTEXT = Context(prec=100)
+
+
+def shipment_key(parcels: List[ParcelMeta],
+                 advanced_packing: bool = False) -> str:
+    """Returns a canonical key for a shipment, so that the same multiset of
+    `Parcel`s produces the same key regardless of ordering or grouping.
+    """
+    shape_counts: Counter = Counter()
+    for group in group_parcels(parcels):
+        # (l, w, h) and (w, l, h) are interchangeable, as are 1 and 1.0
+        l, w = sorted((group.length, group.width))
+        shape = tuple(str(d.normalize(_KEY_CONTEXT))
+                      for d in (l, w, group.height, group.weight))
+        shape_counts[shape] += group.quantity
+    canonical = repr((sorted(shape_counts.items()), bool(advanced_packing)))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def catalog_version(containers: List[ContainerMeta]) -> str:
+    """Returns a fingerprint of the `Container` catalog, which changes
+    whenever a `Container` is added, removed, reordered or modified.
+    """
+    # Only looks at the integer `units` the packing logic runs on, which is
+    # much cheaper than formatting every Decimal, as this runs per request
+    fingerprint = [(c.name, c.max_single_weight_units,
+                    c.max_total_weight_units,
+                    [compt.dims for compt in c.compartments])
+                   for c in containers]
+    return hashlib.sha256(repr(fingerprint).encode()).hexdigest()
+
+
+class ResultCache:
+    """Bounded LRU mapping shipment keys to the name of the smallest
+    `Container` they fit in, kept in memory. Results are lost whenever the
+    server restarts and are not shared between uvicorn workers.
+
+    Results depend on the `Container` catalog, so the cache is cleared
+    whenever `catalog_version` of `containers` changes.
+    """
+
+    def __init__(self, containers: List[ContainerMeta],
+                 max_size: int = 1024):
+        self.containers = containers
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._results: OrderedDict = OrderedDict()
+        self._version = catalog_version(containers)
+        self._lock = threading.Lock()
+
+    def _check_version(self) -> None:
+        version = catalog_version(self.containers)
+        if version != self._version:
+            self._results.clear()
+            self._version = version
+
+    def get(self, key: Hashable):
+        """Returns the cached container name, or `MISSING`."""
+        with self._lock:
+            self._check_version()
+            if key not in self._results:
+                self.misses += 1
+                return MISSING
+            self.hits += 1
+            self._results.move_to_end(key)
+            return self._results[key]
+
+    def put(self, key: Hashable, name: Optional[str]) -> None:
+        with self._lock:
+            self._check_version()
+            self._results[key] = name
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+
+class SQLiteResultCache(ResultCache):
+    """Stores results in a SQLite database, so that they survive restarts and
+    are shared across uvicorn workers on the same machine.
+
+    Results are stored along with the `catalog_version` they were computed
+    for and are only returned for that version. Once more than `max_size`
+    results are stored, the least recently used are evicted, whichever
+    version they belong to. Hit and miss counts are tracked per process.
+    """
+
+    def __init__(self, path: str, containers: List[ContainerMeta],
+                 max_size: int = 1024):
+        super().__init__(containers, max_size)
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT NOT NULL,"
+                " version TEXT NOT NULL,"
+                " name TEXT,"
+                " accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (key, version))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_accessed_at"
+                         " ON results (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _check_version(self) -> None:
+        # Results of other versions are left for the eviction, as other
+        # workers may not have picked up the change yet
+        self._version = catalog_version(self.containers)
+
+    def get(self, key: Hashable):
+        """Returns the cached container name, or `MISSING`."""
+        self._check_version()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT name FROM results WHERE key = ? AND version = ?",
+                (key, self._version)).fetchone()
+            if row is None:
+                self.misses += 1
+                return MISSING
+            conn.execute("UPDATE results SET accessed_at = ?"
+                         " WHERE key = ? AND version = ?",
+                         (time.time(), key, self._version))
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: Hashable, name: Optional[str]) -> None:
+        self._check_version()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results"
+                " (key, version, name, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, self._version, name, time.time()))
+            self._evict_overflow(conn)
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def _evict_overflow(self, conn: sqlite3.Connection) -> None:
+        overflow = len(self) - self.max_size
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM results WHERE rowid IN ("
+                " SELECT rowid FROM results ORDER BY accessed_at LIMIT ?)",
+                (overflow,))
+
+
+def create_result_cache(url: str, containers: List[ContainerMeta],
+                        max_size: int = 1024) -> ResultCache:
+    """Creates a `ResultCache` from a url, either `memory` or
+    `sqlite:///<path>`.
+    """
+    if url == "memory":
+        return ResultCache(containers, max_size=max_size)
+    if url.startswith("sqlite:///"):
+        return SQLiteResultCache(url[len("sqlite:///"):], containers,
+                                 max_size=max_size)
+    raise ValueError("Unsupported result cache: %s" % url)
@@ -1,10 +1,13 @@
+import json
+import os
 from dataclasses import field
 from decimal import Decimal
-from typing import List
+from typing import List, Tuple
 
 from pydantic.dataclasses import dataclass
 
-from .parcel import ParcelMeta
+from .parcel import ParcelMeta, group_parcels
+from .units import capacity_units, to_units
 
 
 @dataclass
@@ -17,6 +20,10 @@ class CompartmentMeta:
     width: Decimal
     height: Decimal
     volume: Decimal = field(init=False)
+    # Dimensions and volume in integer `units`, used by the fit checks and the
+    # packing engine
+    dims: Tuple[int, int, int] = field(init=False, repr=False, compare=False)
+    volume_units: int = field(init=False, repr=False, compare=False)
 
     def __post_init__(self):
         # BUG: For some reason we have to reinitialize each as Decimals to
@@ -24,15 +31,22 @@ class CompartmentMeta:
         self.volume = (
             Decimal(self.length) * Decimal(self.width) * Decimal(self.height)
         )
+        l, w, h = (capacity_units(self.length), capacity_units(self.width),
+                   capacity_units(self.height))
+        self.dims = (l, w, h)
+        self.volume_units = l * w * h
 
     def can_fit(self, parcel: ParcelMeta) -> bool:
         """Returns whether the `Compartment` can fit the `Parcel`, assuming
         it's empty.
         """
-        for l, w, h in parcel.legal_orientations():
-            if l <= self.length and w <= self.width and h <= self.height:
-                return True
-        return False
+        length, width, height = self.dims
+        l, w, h = parcel.dims
+        if h > height:
+            return False
+        # Parcels must be placed upright, so we can only swap l and w
+        return ((l <= length and w <= width)
+                or (w <= length and l <= width))
 
 
 @dataclass
@@ -46,17 +60,31 @@ class ContainerMeta:
     compartments: List[CompartmentMeta]
     max_single_weight: Decimal
     max_total_weight: Decimal
+    # Cost of using one of these `Container`s, used when planning a fleet
+    cost: Decimal = Decimal(1)
+    # Weight limits, total volume and cost in integer `units`
+    max_single_weight_units: int = field(init=False, repr=False,
+                                         compare=False)
+    max_total_weight_units: int = field(init=False, repr=False, compare=False)
+    volume_units: int = field(init=False, repr=False, compare=False)
+    cost_units: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.max_single_weight_units = capacity_units(self.max_single_weight)
+        self.max_total_weight_units = capacity_units(self.max_total_weight)
+        self.volume_units = sum(c.volume_units for c in self.compartments)
+        self.cost_units = to_units(self.cost)
 
     def can_carry_all_by_weight(self, parcels: List[ParcelMeta]) -> bool:
         """Returns whether the `Container` can support the weight of the
         supplied `Parcel`s.
         """
         total_parcel_weight = 0
-        for p in parcels:
-            if p.weight > self.max_single_weight:
+        for group in group_parcels(parcels):
+            if group.weight_units > self.max_single_weight_units:
                 return False
-            total_parcel_weight += p.weight
-            if total_parcel_weight > self.max_total_weight:
+            total_parcel_weight += group.weight_units * group.quantity
+            if total_parcel_weight > self.max_total_weight_units:
                 return False
         return True
 
@@ -74,8 +102,10 @@ class ContainerMeta:
         `Contaniner`, assuming each `Compartment` is empty. Can be used as an
         optimization before packing.
         """
-        for p in parcels:
-            if not self.can_fit(p):
+        # Identical parcels share the same answer, so only check each shape
+        # once
+        for group in group_parcels(parcels):
+            if not self.can_fit(group):
                 return False
         return True
 
@@ -83,18 +113,65 @@ class ContainerMeta:
         """Returns whether the `Container` can fit all `Parcels` purely by
         volume. This response is naiive, to get an accurate response, we need
         to attempt a form of 3D bin-packing."""
-        parcels_volume = sum([p.volume for p in parcels])
-        compartments_volume = sum([c.volume for c in self.compartments])
-        return parcels_volume <= compartments_volume
+        parcels_volume = sum([g.volume_units * g.quantity
+                              for g in group_parcels(parcels)])
+        return parcels_volume <= self.volume_units
 
 
-# Container types
+def capacity_key(cont: ContainerMeta) -> Tuple[int, int, int]:
+    """Sort key ordering `Container`s by capacity, smallest first."""
+    return (cont.volume_units, cont.max_total_weight_units,
+            cont.max_single_weight_units)
+
 
-COMPACT = ContainerMeta('compact', [CompartmentMeta(24, 24, 36)], 50, 150)
-SEDAN = ContainerMeta('sedan', [CompartmentMeta(24, 24, 36),
-                                CompartmentMeta(24, 24, 48)], 50, 250)
-VAN = ContainerMeta('van', [CompartmentMeta(120, 60, 60)], 70, 500)
-TRUCK = ContainerMeta('truck', [CompartmentMeta(150, 96, 84)], 500, 2000)
+def load_catalog(path: str) -> List[ContainerMeta]:
+    """Loads the `Container` types from a JSON config file, ordered by
+    capacity.
+
+    The file holds a list of `containers`, each with a `name`, its
+    `compartments` (each with a `length`, `width` and `height`), its
+    `max_single_weight` and `max_total_weight` and optionally its `cost`.
+    """
+    with open(path) as f:
+        # Keep decimals exact, as they are for `Parcel`s
+        config = json.load(f, parse_float=Decimal)
+
+    containers = []
+    names = set()
+    for entry in config["containers"]:
+        if entry["name"] in names:
+            raise ValueError(
+                "Duplicate container name in catalog: %s" % entry["name"])
+        names.add(entry["name"])
+        containers.append(ContainerMeta(
+            name=entry["name"],
+            compartments=[
+                CompartmentMeta(c["length"], c["width"], c["height"])
+                for c in entry["compartments"]],
+            max_single_weight=entry["max_single_weight"],
+            max_total_weight=entry["max_total_weight"],
+            cost=entry.get("cost", 1)))
+    # Stable, so `Container`s of the same capacity keep the file's order
+    return sorted(containers, key=capacity_key)
+
+
+# Container types
 
-# Ordered list of container types by relative size
-CONTAINER_TYPES_BY_SIZE = [COMPACT, SEDAN, VAN, TRUCK]
+# Catalog shipped with the API, see `load_catalog` for its format
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(__file__),
+                                    "containers.json")
+DEFAULT_CONTAINER_TYPES = load_catalog(DEFAULT_CATALOG_PATH)
+_DEFAULTS_BY_NAME = {cont.name: cont for cont in DEFAULT_CONTAINER_TYPES}
+
+COMPACT = _DEFAULTS_BY_NAME['compact']
+SEDAN = _DEFAULTS_BY_NAME['sedan']
+VAN = _DEFAULTS_BY_NAME['van']
+TRUCK = _DEFAULTS_BY_NAME['truck']
+
+# Ordered list of container types by relative size. Loaded from the file at
+# `CONTAINER_CATALOG` when set, so that every process sizing shipments sees
+# the same catalog.
+CONTAINER_CATALOG = os.environ.get("CONTAINER_CATALOG")
+CONTAINER_TYPES_BY_SIZE = (load_catalog(CONTAINER_CATALOG)
+                           if CONTAINER_CATALOG
+                           else DEFAULT_CONTAINER_TYPES)
@@ -0,0 +1,464 @@
+"""////////////////////////////////////////////////////////////////////////////
+
+Extreme point packing, based on Crainic, Perboli and Tadei, "Extreme
+Point-Based Heuristics for Three-Dimensional Bin Packing" (2008).
+
+`Parcel`s are placed one at a time, largest first, at the first "extreme
+point" they fit. Extreme points are the corners where a new `Parcel` could
+rest against those already placed. Each time a `Parcel` is placed, its three
+far corners are projected back towards the walls and floor of the
+`Compartment` to create new extreme points. Unlike the strip/layer heuristic
+in `packer.py`, this tracks the actual position of every `Parcel`, so any
+packing it finds is physically valid.
+
+Placed `Parcel`s are indexed in a uniform grid over the `Compartment`, so
+overlap checks and projections only look at nearby `Parcel`s rather than
+every one placed so far. Each extreme point keeps the free space around
+it, and the points are kept in blocks that record the free space of all of
+their points, so placing a `Parcel` skips whole blocks of points it can't
+fit rather than checking each of them.
+
+///////////////////////////////////////////////////////////////////////////////
+"""
+from bisect import bisect_left, bisect_right, insort
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from . import stats
+from .box import Box
+from .container import CompartmentMeta, ContainerMeta
+
+# Number of grid cells along each axis of a `Compartment`
+GRID_CELLS = 16
+# Number of `Box`es placed between checks of `should_stop`
+STOP_CHECK_INTERVAL = 64
+# Number of extreme points per block of `_ExtremePoints`, blocks are split
+# once they hold twice as many
+POINT_BLOCK_SIZE = 32
+
+
+class Placement(NamedTuple):
+    """A `Box` placed with its back, left, bottom corner at (x, y, z).
+
+    x runs along the `Compartment`'s length, y along its width and z along
+    its height.
+    """
+    box: Box
+    x: int
+    y: int
+    z: int
+
+
+class _Grid:
+    """Uniform grid over a `Compartment` indexing the space taken up by
+    placed `Box`es."""
+
+    def __init__(self, dims: Tuple[int, int, int]):
+        self.cell_size = tuple(max(1, -(-d // GRID_CELLS)) for d in dims)
+        # Each space is (x0, y0, z0, x1, y1, z1)
+        self.spaces: List[Tuple[int, ...]] = []
+        self.cells: Dict[Tuple[int, int, int], List[int]] = {}
+
+    def _cell_range(self, axis: int, start: int, end: int) -> range:
+        """Cells along `axis` covering [start, end)."""
+        size = self.cell_size[axis]
+        return range(start // size, (end - 1) // size + 1)
+
+    def _cells(self, space: Tuple[int, ...]):
+        x0, y0, z0, x1, y1, z1 = space
+        for i in self._cell_range(0, x0, x1):
+            for j in self._cell_range(1, y0, y1):
+                for k in self._cell_range(2, z0, z1):
+                    yield i, j, k
+
+    def add(self, space: Tuple[int, ...]) -> None:
+        index = len(self.spaces)
+        self.spaces.append(space)
+        for cell in self._cells(space):
+            self.cells.setdefault(cell, []).append(index)
+
+    def overlaps(self, space: Tuple[int, ...]) -> bool:
+        """Returns whether `space` overlaps any placed `Box`."""
+        x0, y0, z0, x1, y1, z1 = space
+        spaces = self.spaces
+        for cell in self._cells(space):
+            for index in self.cells.get(cell, ()):
+                a0, b0, c0, a1, b1, c1 = spaces[index]
+                if (a0 < x1 and x0 < a1 and b0 < y1 and y0 < b1
+                        and c0 < z1 and z0 < c1):
+                    return True
+        return False
+
+    def project(self, point: Tuple[int, int, int], axis: int) -> int:
+        """Returns how far the point can be moved back along `axis` before it
+        hits a placed `Box` or the wall of the `Compartment`."""
+        coord = point[axis]
+        if coord == 0:
+            return 0
+        a, b = [other for other in range(3) if other != axis]
+        pa, pb = point[a], point[b]
+        cell = [point[i] // self.cell_size[i] for i in range(3)]
+        spaces = self.spaces
+        # Walk back from the nearest cell, the first `Box` we find that ends
+        # behind the point is also the nearest one
+        for i in range((coord - 1) // self.cell_size[axis], -1, -1):
+            cell[axis] = i
+            nearest = -1
+            for index in self.cells.get(tuple(cell), ()):
+                space = spaces[index]
+                end = space[axis + 3]
+                if (nearest < end <= coord
+                        and space[a] <= pa < space[a + 3]
+                        and space[b] <= pb < space[b + 3]):
+                    if end == coord:
+                        # Touching the point, nothing can be nearer
+                        return end
+                    nearest = end
+            if nearest >= 0:
+                return nearest
+        return 0
+
+    def near(self, point: Tuple[int, int, int],
+             extents: Tuple[int, int, int]) -> List[Tuple[int, int, int]]:
+        """Returns where each placed `Box` within `extents` of the point
+        starts, relative to it, as (x, y, z). A `Box` placed at the point
+        overlaps one of them exactly when it extends past it along every
+        axis."""
+        x, y, z = point
+        x1, y1, z1 = x + extents[0], y + extents[1], z + extents[2]
+        spaces = self.spaces
+        seen = set()
+        corners = []
+        for cell in self._cells((x, y, z, x1, y1, z1)):
+            for index in self.cells.get(cell, ()):
+                if index in seen:
+                    continue
+                seen.add(index)
+                a0, b0, c0, a1, b1, c1 = spaces[index]
+                if (x < a1 and a0 < x1 and y < b1 and b0 < y1
+                        and z < c1 and c0 < z1):
+                    corners.append((max(a0 - x, 0), max(b0 - y, 0),
+                                    max(c0 - z, 0)))
+        return corners
+
+
+class _ExtremePoints:
+    """Extreme points as (z, y, x), in order, split into blocks.
+
+    Each point keeps its free spaces: the largest sizes, along x, y and z,
+    of a `Box` placed there that would neither hit a placed `Box` nor a
+    wall. Each block keeps the free spaces of all of its points as (shorter
+    side, longer side, height), which hold for either orientation, so a
+    `Box` that fits none of them skips the whole block.
+
+    Placing a `Box` only ever takes space away, so the free spaces of a
+    block may be larger than those of its points, but never smaller. They
+    are recomputed whenever a `Box` fits a block's spaces but none of its
+    points.
+    """
+
+    def __init__(self):
+        self.blocks: List[List[Tuple[int, int, int]]] = []
+        # First point of each block, for finding the block a point goes in
+        self.firsts: List[Tuple[int, int, int]] = []
+        self.block_spaces: List[List[Tuple[int, int, int]]] = []
+        self.spaces: Dict[Tuple[int, int, int],
+                          List[Tuple[int, int, int]]] = {}
+
+    def __contains__(self, key: Tuple[int, int, int]) -> bool:
+        return key in self.spaces
+
+    def locate(self, key: Tuple[int, int, int]) -> Tuple[int, int]:
+        """Returns the block, and the position within it, of the first point
+        from `key` onwards."""
+        i = max(0, bisect_right(self.firsts, key) - 1)
+        if i == len(self.blocks):
+            return i, 0
+        return i, bisect_left(self.blocks[i], key)
+
+    def add(self, key: Tuple[int, int, int],
+            spaces: List[Tuple[int, int, int]]) -> None:
+        self.spaces[key] = spaces
+        shapes = [_shape_of(space) for space in spaces]
+        if not self.blocks:
+            self.blocks.append([key])
+            self.firsts.append(key)
+            self.block_spaces.append(shapes)
+            return
+        i = max(0, bisect_right(self.firsts, key) - 1)
+        block = self.blocks[i]
+        insort(block, key)
+        self.firsts[i] = block[0]
+        self.block_spaces[i].extend(shapes)
+        if len(block) >= 2 * POINT_BLOCK_SIZE:
+            self.blocks[i:i + 1] = [block[:POINT_BLOCK_SIZE],
+                                    block[POINT_BLOCK_SIZE:]]
+            self.firsts[i:i + 1] = [block[0], block[POINT_BLOCK_SIZE]]
+            self.block_spaces[i:i + 1] = [[], []]
+            self.update_block(i)
+            self.update_block(i + 1)
+
+    def update_block(self, i: int) -> None:
+        """Recomputes the free spaces of a block from those of its
+        points."""
+        self.block_spaces[i] = _outermost(
+            [_shape_of(space) for key in self.blocks[i]
+             for space in self.spaces[key]])
+
+
+def _sort_key(box: Box):
+    # Largest and tallest first
+    return (-box.volume, -box.height, -max(box.length, box.width))
+
+
+def _shape(box: Box) -> Tuple[int, int, int]:
+    return (min(box.length, box.width), max(box.length, box.width),
+            box.height)
+
+
+def _shape_of(space: Tuple[int, int, int]) -> Tuple[int, int, int]:
+    # Comparable with `_shape`
+    return (min(space[0], space[1]), max(space[0], space[1]), space[2])
+
+
+def _admits(spaces: List[Tuple[int, int, int]],
+            shape: Tuple[int, int, int]) -> bool:
+    """Returns whether a `Box` of the shape fits one of the spaces, as
+    returned by `_shape_of`."""
+    short, long, height = shape
+    for a, b, c in spaces:
+        if short <= a and long <= b and height <= c:
+            return True
+    return False
+
+
+def _outermost(spaces: List[Tuple[int, int, int]]
+               ) -> List[Tuple[int, int, int]]:
+    """Drops the spaces that fit inside another one."""
+    outermost: List[Tuple[int, int, int]] = []
+    for space in sorted(set(spaces), key=sum, reverse=True):
+        if not any(space[0] <= other[0] and space[1] <= other[1]
+                   and space[2] <= other[2] for other in outermost):
+            outermost.append(space)
+    return outermost
+
+
+def _limits(boxes: List[Box]) -> Tuple[int, int, int]:
+    """Returns the longest side and the tallest height of any of the
+    `Box`es, beyond which the space around an extreme point doesn't
+    matter."""
+    side = max((max(box.length, box.width) for box in boxes), default=0)
+    height = max((box.height for box in boxes), default=0)
+    return side, side, height
+
+
+def _largest_spaces(extents: Tuple[int, int, int],
+                    corners: List[Tuple[int, int, int]]
+                    ) -> List[Tuple[int, int, int]]:
+    """Returns the largest spaces at a point, no larger than `extents`, that
+    don't reach past any of the corners of the `Box`es near it, see
+    `_Grid.near`."""
+    # A largest space stops at a wall or at a corner along x and y, and
+    # then reaches as high as the corners within that footprint allow
+    lengths = {corner[0] for corner in corners if corner[0] < extents[0]}
+    widths = {corner[1] for corner in corners if corner[1] < extents[1]}
+    spaces = []
+    for length in lengths | {extents[0]}:
+        for width in widths | {extents[1]}:
+            height = min([extents[2]] + [
+                corner[2] for corner in corners
+                if corner[0] < length and corner[1] < width])
+            if length and width and height:
+                spaces.append((length, width, height))
+    return _outermost(spaces)
+
+
+# Sorts after every extreme point
+_END = (float("inf"),) * 3
+
+
+class _CompartmentState:
+    """`Box`es placed in a `Compartment` so far, and its extreme points.
+
+    Every extreme point keeps its free spaces, so that checking whether a
+    `Box` fits there doesn't need to look through the grid again. Only
+    `Box`es as large as `limits` are placed, so `Box`es placed further away
+    from a point don't change its free spaces.
+
+    Placing a `Box` takes space away from the points around it, so their
+    free spaces may be out of date, but only ever too large. A `Box` that
+    doesn't fit a point's free spaces doesn't fit there at all, and those
+    that do are checked against the grid before being placed, refreshing
+    the point if that fails.
+    """
+
+    def __init__(self, compt: CompartmentMeta, limits: Tuple[int, int, int]):
+        self.dims = compt.dims
+        self.limits = limits
+        self.grid = _Grid(compt.dims)
+        self.placements: List[Placement] = []
+        # Ordered as (z, y, x), so that we fill the floor first
+        self.points = _ExtremePoints()
+        self.points.add((0, 0, 0), self._free_spaces(0, 0, 0))
+        # Extreme points before `resume_key` are known not to fit
+        # `resume_shape`. `Box`es are placed in order of size, so those of
+        # the same shape come one after the other
+        self.resume_shape: Optional[Tuple[int, int, int]] = None
+        self.resume_key = (0, 0, 0)
+
+    def place(self, box: Box) -> bool:
+        """Places the `Box` at the first extreme point it fits, trying each
+        upright orientation. Returns whether it could be placed."""
+        shape = _shape(box)
+        orientations = (box,) if box.turned is box else (box, box.turned)
+        points = self.points
+        i, j = points.locate(self.resume_key if shape == self.resume_shape
+                             else (0, 0, 0))
+        while i < len(points.blocks):
+            if _admits(points.block_spaces[i], shape):
+                for key in points.blocks[i][j:]:
+                    oriented = self._fitting(key, orientations)
+                    if oriented is None:
+                        continue
+                    z, y, x = key
+                    if self.grid.overlaps(_space(oriented, x, y, z)):
+                        # `Box`es were placed near the point since its free
+                        # spaces were found
+                        points.spaces[key] = self._free_spaces(x, y, z)
+                        oriented = self._fitting(key, orientations)
+                        if oriented is None:
+                            continue
+                    # Nothing else can be placed at the point
+                    points.spaces[key] = []
+                    self.resume_shape, self.resume_key = shape, key
+                    self._add(Placement(oriented, x, y, z),
+                              _space(oriented, x, y, z))
+                    return True
+                # The block's free spaces were too large
+                points.update_block(i)
+            i, j = i + 1, 0
+        # Nothing left fits this shape, until new extreme points are added
+        self.resume_shape = shape
+        self.resume_key = _END
+        return False
+
+    def _fitting(self, key: Tuple[int, int, int],
+                 orientations: Tuple[Box, ...]) -> Optional[Box]:
+        """Returns the first orientation of a `Box` that fits one of the
+        point's free spaces."""
+        spaces = self.points.spaces[key]
+        for oriented in orientations:
+            length, width, height = (oriented.length, oriented.width,
+                                     oriented.height)
+            for a, b, c in spaces:
+                if length <= a and width <= b and height <= c:
+                    return oriented
+        return None
+
+    def _free_spaces(self, x: int, y: int,
+                     z: int) -> List[Tuple[int, int, int]]:
+        length, width, height = self.dims
+        extents = (min(self.limits[0], length - x),
+                   min(self.limits[1], width - y),
+                   min(self.limits[2], height - z))
+        corners: List[Tuple[int, int, int]] = []
+        # A corner further along every axis than another is never the only
+        # one in the way
+        for corner in sorted(self.grid.near((x, y, z), extents), key=sum):
+            if not any(other[0] <= corner[0] and other[1] <= corner[1]
+                       and other[2] <= corner[2] for other in corners):
+                corners.append(corner)
+        return _largest_spaces(extents, corners)
+
+    def _add(self, placement: Placement, space: Tuple[int, ...]) -> None:
+        self.placements.append(placement)
+        self.grid.add(space)
+        x0, y0, z0, x1, y1, z1 = space
+        project = self.grid.project
+        candidates = [
+            (x1, project((x1, y0, z0), 1), z0),
+            (x1, y0, project((x1, y0, z0), 2)),
+            (project((x0, y1, z0), 0), y1, z0),
+            (x0, y1, project((x0, y1, z0), 2)),
+            (project((x0, y0, z1), 0), y0, z1),
+            (x0, project((x0, y0, z1), 1), z1),
+        ]
+        length, width, height = self.dims
+        for x, y, z in candidates:
+            key = (z, y, x)
+            if (x >= length or y >= width or z >= height
+                    or key in self.points):
+                continue
+            self.points.add(key, self._free_spaces(x, y, z))
+            # The last shape placed may fit here, if it failed before
+            if key < self.resume_key:
+                self.resume_key = key
+
+
+def _space(box: Box, x: int, y: int, z: int) -> Tuple[int, ...]:
+    return (x, y, z, x + box.length, y + box.width, z + box.height)
+
+
+def pack_compartment(compt: CompartmentMeta, boxes: List[Box]
+                     ) -> Tuple[List[Placement], List[Box]]:
+    """Packs as many `Box`es as possible into a single `Compartment`. Returns
+    where each packed `Box` was placed, along with those that didn't fit."""
+    state = _CompartmentState(compt, _limits(boxes))
+    rest = []
+    for box in sorted(boxes, key=_sort_key):
+        if not state.place(box):
+            rest.append(box)
+    return state.placements, rest
+
+
+def pack_container(cont: ContainerMeta, boxes: List[Box]
+                   ) -> Tuple[List[List[Placement]], List[Box]]:
+    """Packs as many `Box`es as possible into the `Container`'s
+    `Compartment`s. Returns where each packed `Box` was placed, per
+    `Compartment`, along with those that didn't fit anywhere.
+
+    All `Compartment`s are packed in a single pass over the sorted `Box`es:
+    each `Box` goes into the first `Compartment` it fits, so later
+    `Compartment`s pick up where earlier ones left off without sorting or
+    placing anything twice.
+    """
+    limits = _limits(boxes)
+    states = [_CompartmentState(compt, limits)
+              for compt in cont.compartments]
+    rest = []
+    for box in sorted(boxes, key=_sort_key):
+        if not _place_any(states, box):
+            rest.append(box)
+    return [state.placements for state in states], rest
+
+
+def can_fit_container(cont: ContainerMeta, boxes: List[Box],
+                      should_stop: Optional[Callable[[], bool]] = None
+                      ) -> Optional[bool]:
+    """Returns whether all `Box`es can be packed into the `Container`.
+
+    Same as `pack_container`, but gives up on the first `Box` that doesn't
+    fit in any `Compartment`. Returns None once `should_stop` returns True,
+    which is checked every `STOP_CHECK_INTERVAL` `Box`es.
+    """
+    limits = _limits(boxes)
+    states = [_CompartmentState(compt, limits)
+              for compt in cont.compartments]
+    with stats.timer("sort"):
+        boxes = sorted(boxes, key=_sort_key)
+    for i, box in enumerate(boxes):
+        if (should_stop is not None and i % STOP_CHECK_INTERVAL == 0
+                and should_stop()):
+            stats.count("boxes_placed", i)
+            return None
+        if not _place_any(states, box):
+            stats.count("boxes_placed", i)
+            # Gave up before trying the rest of the `Box`es
+            stats.count("early_exits:%s" % cont.name)
+            return False
+    stats.count("boxes_placed", len(boxes))
+    return True
+
+
+def _place_any(states: List[_CompartmentState], box: Box) -> bool:
+    """Places the `Box` in the first `Compartment` it fits."""
+    return any(state.place(box) for state in states)
@@ -0,0 +1,187 @@
+"""////////////////////////////////////////////////////////////////////////////
+
+Fleet planning, for shipments too large for a single `Container`.
+
+We pick vehicles one at a time. Each round, every `Container` type is packed
+with the largest `Parcel`s left, using the extreme point engine, and we keep
+the one that carries the most for its cost, by volume and weight. Whenever the
+rest of the shipment fits in a single `Container`, finishing with the cheapest
+one it fits in is recorded as an option, and we return the cheapest plan we
+found.
+
+Each round only offers a `Container` the `Parcel`s it could possibly take:
+a window of the largest `Parcel`s left, up to its weight limit and a multiple
+of its volume. This bounds the work per vehicle, regardless of the size of the
+shipment, so that shipments of tens of thousands of `Parcel`s can be planned.
+
+///////////////////////////////////////////////////////////////////////////////
+"""
+from collections import Counter
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional
+
+from . import extreme_point
+from .box import Box
+from .container import CONTAINER_TYPES_BY_SIZE, ContainerMeta
+from .parcel import ParcelGroupMeta, ParcelMeta, group_parcels
+
+# Each round offers a `Container` at most this many times its volume in
+# `Parcel`s
+WINDOW_VOLUME_FACTOR = 2
+
+
+class FleetVehicle(NamedTuple):
+    """A vehicle in a `FleetPlan`, along with the `Parcel`s it carries."""
+    container: ContainerMeta
+    parcels: List[ParcelGroupMeta]
+
+
+class FleetPlan(NamedTuple):
+    """Result of `plan_fleet`."""
+    vehicles: List[FleetVehicle]
+    # `Parcel`s that don't fit in any `Container` on their own
+    unassigned: List[ParcelGroupMeta]
+
+    @property
+    def cost(self) -> Decimal:
+        return sum((v.container.cost for v in self.vehicles), Decimal(0))
+
+
+def plan_fleet(parcels: List[ParcelMeta],
+               containers: Optional[List[ContainerMeta]] = None
+               ) -> FleetPlan:
+    """Returns a low cost mix of vehicles from `containers` that together
+    carry all of the `Parcel`s, along with those that can't be carried by
+    any of them."""
+    if len(parcels) == 0:
+        raise ValueError("Must provide at least one Parcel")
+    if containers is None:
+        containers = CONTAINER_TYPES_BY_SIZE
+
+    unassigned = []
+    remaining: List[Box] = []
+    for group in group_parcels(parcels):
+        if any(_can_carry(cont, group) for cont in containers):
+            # The same `Box` for every unit, with the group as its `Parcel`
+            remaining.extend([Box.from_parcel(group)] * group.quantity)
+        else:
+            unassigned.append(group)
+    remaining.sort(key=extreme_point._sort_key)
+    by_cost = sorted(containers, key=lambda cont: cont.cost_units)
+
+    # Finishing with any more than one vehicle costs at least this much
+    min_finish_cost = 2 * by_cost[0].cost_units if by_cost else 0
+    vehicles: List[FleetVehicle] = []
+    cost = 0
+    best, best_cost = None, None
+    while remaining:
+        cont = _single_vehicle(by_cost, remaining)
+        if cont is not None:
+            # Finishing here is one option, carrying on with more, smaller
+            # vehicles may still be cheaper
+            if best is None or cost + cont.cost_units < best_cost:
+                best = vehicles + [FleetVehicle(cont, _group(remaining))]
+                best_cost = cost + cont.cost_units
+            if cont.cost_units <= min_finish_cost:
+                break
+        cont, packed = _best_vehicle(containers, remaining)
+        vehicles.append(FleetVehicle(cont, _group(packed)))
+        cost += cont.cost_units
+        remaining = _remove(remaining, packed)
+
+    if best is not None and (remaining or best_cost <= cost):
+        vehicles = best
+    return FleetPlan(vehicles, unassigned)
+
+
+def _can_carry(cont: ContainerMeta, parcel: ParcelMeta) -> bool:
+    return (parcel.weight_units <= cont.max_single_weight_units
+            and parcel.weight_units <= cont.max_total_weight_units
+            and cont.can_fit(parcel))
+
+
+def _single_vehicle(by_cost: List[ContainerMeta], boxes: List[Box]
+                    ) -> Optional[ContainerMeta]:
+    """Returns the cheapest `Container` that carries all of the `Box`es on
+    its own, if any."""
+    weight = sum(box.parcel.weight_units for box in boxes)
+    volume = sum(box.volume for box in boxes)
+    shapes = {id(box.parcel): box.parcel for box in boxes}.values()
+    for cont in by_cost:
+        if (weight <= cont.max_total_weight_units
+                and volume <= cont.volume_units
+                and all(_can_carry(cont, parcel) for parcel in shapes)
+                and extreme_point.can_fit_container(cont, boxes)):
+            return cont
+    return None
+
+
+def _best_vehicle(containers: List[ContainerMeta], boxes: List[Box]):
+    """Packs each `Container` with a window of the `Box`es, returning the one
+    carrying the most for its cost along with what it carries.
+
+    What a `Container` carries is measured as its share of the volume left
+    plus its share of the weight left, so that `Container`s limited by weight
+    rather than space are judged fairly.
+    """
+    total_volume = sum(box.volume for box in boxes)
+    total_weight = sum(box.parcel.weight_units for box in boxes)
+    best, best_packed, best_load = None, [], 0
+    for cont in containers:
+        placements, _ = extreme_point.pack_container(
+            cont, _window(cont, boxes))
+        packed = [p.box for compt in placements for p in compt]
+        # Both shares over a common denominator, to keep to ints
+        load = (sum(box.volume for box in packed) * total_weight
+                + sum(box.parcel.weight_units for box in packed)
+                * total_volume)
+        # Compare load / cost without dividing
+        if load and (best is None or load * best.cost_units
+                     > best_load * cont.cost_units):
+            best, best_packed, best_load = cont, packed, load
+    # Every `Box` fits some `Container` on its own, so something was packed
+    return best, best_packed
+
+
+def _window(cont: ContainerMeta, boxes: List[Box]) -> List[Box]:
+    """Returns the largest `Box`es the `Container` could take, within its
+    weight limit and `WINDOW_VOLUME_FACTOR` times its volume."""
+    window = []
+    weight = volume = 0
+    max_volume = WINDOW_VOLUME_FACTOR * cont.volume_units
+    for box in boxes:
+        if volume >= max_volume or weight >= cont.max_total_weight_units:
+            break
+        parcel = box.parcel
+        if (weight + parcel.weight_units <= cont.max_total_weight_units
+                and _can_carry(cont, parcel)):
+            window.append(box)
+            weight += parcel.weight_units
+            volume += box.volume
+    return window
+
+
+def _group(boxes: List[Box]) -> List[ParcelGroupMeta]:
+    """Returns the `Parcel`s in the `Box`es, grouped."""
+    counts: Dict[int, int] = Counter()
+    parcels = {}
+    for box in boxes:
+        counts[id(box.parcel)] += 1
+        parcels[id(box.parcel)] = box.parcel
+    return [ParcelGroupMeta(p.length, p.width, p.height, p.weight,
+                            quantity=counts[key])
+            for key, p in parcels.items()]
+
+
+def _remove(boxes: List[Box], packed: List[Box]) -> List[Box]:
+    """Returns `boxes` without those `packed`, keeping their order."""
+    # Rotated `Box`es share their `Parcel`, so count by `Parcel`
+    counts = Counter(id(box.parcel) for box in packed)
+    remaining = []
+    for box in boxes:
+        key = id(box.parcel)
+        if counts[key]:
+            counts[key] -= 1
+        else:
+            remaining.append(box)
+    return remaining
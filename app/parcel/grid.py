@@ -0,0 +1,76 @@
+"""////////////////////////////////////////////////////////////////////////////
+
+Closed-form packing for shipments of one or a few kinds of `Parcel`.
+
+Identical `Parcel`s pack well in a grid. Each layer of a `Compartment` holds a
+single kind of `Parcel`, upright, in at most two blocks of rows: the floor is
+cut once, along its length or its width, and each side is filled with rows of
+`Parcel`s turned the same way. A layer's capacity is the best of every such
+cut, which only takes as long as there are `Parcel`s along a side of the
+floor, however many `Parcel`s there are to pack.
+
+Layers of each kind are then stacked in the `Compartment`s of a `Container`,
+tallest kinds first. This only ever proves that a shipment fits: when the
+layers don't fit, the `Parcel`s may still fit some other way, which is left to
+the packing engines.
+
+///////////////////////////////////////////////////////////////////////////////
+"""
+from functools import lru_cache
+from typing import List
+
+from .container import ContainerMeta
+from .parcel import ParcelGroupMeta
+
+# Shipments with more kinds of `Parcel` than this are left to the packing
+# engines, as layers of a single kind waste too much space
+MAX_SKUS = 4
+
+
+def can_fit_container(cont: ContainerMeta, groups: List[ParcelGroupMeta]
+                      ) -> bool:
+    """Returns whether the `Parcel`s fit in the `Container` in layers. False
+    does not mean they can't fit, see above.
+
+    Like the packing engines, this expects a `Container` that passed
+    `feasible_containers`, so weight is not checked again.
+    """
+    if len(groups) > MAX_SKUS:
+        return False
+    groups = sorted(groups, key=lambda g: g.dims[2], reverse=True)
+    remaining = [g.quantity for g in groups]
+    for compt in cont.compartments:
+        compt_length, compt_width, height_left = compt.dims
+        for i, group in enumerate(groups):
+            length, width, height = group.dims
+            if not remaining[i] or height > height_left:
+                continue
+            per_layer = layer_capacity(compt_length, compt_width, length,
+                                       width)
+            if not per_layer:
+                continue
+            layers = min(-(-remaining[i] // per_layer),
+                         height_left // height)
+            remaining[i] = max(remaining[i] - layers * per_layer, 0)
+            height_left -= layers * height
+    return not any(remaining)
+
+
+@lru_cache(maxsize=1024)
+def layer_capacity(floor_length: int, floor_width: int, length: int,
+                   width: int) -> int:
+    """Returns how many `Parcel`s of `length` by `width` fit on the floor in
+    at most two blocks of rows, see above."""
+    best = 0
+    for a, b in ((length, width), (width, length)):
+        # The first block holds the `Parcel`s `a` along the floor's length,
+        # the second the `Parcel`s turned the other way
+        for k in range(floor_length // a + 1):
+            rest = floor_length - k * a
+            best = max(best, k * (floor_width // b)
+                       + (rest // b) * (floor_width // a))
+        for k in range(floor_width // b + 1):
+            rest = floor_width - k * b
+            best = max(best, k * (floor_length // a)
+                       + (floor_length // b) * (rest // a))
+    return best
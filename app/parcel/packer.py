@@ -1,73 +1,272 @@
-import itertools
 import random
-from typing import Dict, List, Tuple
-
+import time
+from bisect import bisect_right
+from enum import Enum
+from typing import (TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional,
+                    Sequence, Tuple)
+
+from . import extreme_point, grid, stats
+from .cache import catalog_version
+from .box import Box, to_boxes, to_parcels
 from .container import CONTAINER_TYPES_BY_SIZE, CompartmentMeta, ContainerMeta
-from .parcel import ParcelMeta
+from .parcel import (ParcelGroupMeta, ParcelMeta, expand_parcels,
+                     group_parcels)
+from .prefilter import ContainerLadder, shipment_totals
+
+if TYPE_CHECKING:
+    from .speculative import SpeculativePacker
+
+
+class PackingEngine(Enum):
+    """Bin-packing logic used by `smallest_needed_container` when
+    `advanced_packing` is enabled."""
+    # Places each `Parcel` at an extreme point, see `extreme_point.py`
+    EXTREME_POINT = "extreme_point"
+    # Strip/layer heuristic adapted from pyShipping, see `bin_pack`
+    STRIP = "strip"
+
+
+class Sizing(NamedTuple):
+    """Result of `size_shipment`."""
+    # Smallest `Container` the `Parcel`s fit in, None if there isn't one
+    container: Optional[ContainerMeta]
+    # False if the deadline cut packing short, in which case `container` is
+    # the first `Container` left that passed the cheap checks, a guess that
+    # no packing backs up
+    proven: bool
 
 
 def smallest_needed_container(
     parcels: List[ParcelMeta],
-    advanced_packing: bool = False
+    advanced_packing: bool = False,
+    on_verdict: Optional[Callable[[ContainerMeta, bool], None]] = None,
+    engine: PackingEngine = PackingEngine.EXTREME_POINT,
+    speculative: Optional["SpeculativePacker"] = None
 ) -> ContainerMeta:
     """Calculates the smallest `Container` that can ship the provided
     `Parcel`s. Returns None if we cannot find a `Container` that can fit all
     the packages.
-    """
-    if len(parcels) == 0:
-        raise ValueError("Must provide at least one Parcel")
 
-    for cont in CONTAINER_TYPES_BY_SIZE:
-        meets_basic_weight_req = cont.can_carry_all_by_weight(parcels)
-        meets_basic_size_req = cont.can_fit_all_individually(parcels)
+    Without `advanced_packing`, we only check that the `Parcel`s fit by
+    volume, which overestimates what a `Container` can hold. With it, the
+    `Parcel`s must actually be packed using `engine`.
 
-        if not meets_basic_weight_req or not meets_basic_size_req:
-            # Shortcircuit having to use our more expensive bin-packing logic
-            continue
-        if len(parcels) == 1:
-            # We already know we can fit the parcel
-            return cont
+    `parcels` may contain `ParcelGroupMeta`s, in which case the weight, size
+    and volume checks run once per group rather than once per unit.
 
-        if advanced_packing and _can_fit_container_advanced(cont, parcels):
-            return cont
-        elif not advanced_packing and _can_fit_container_simple(cont, parcels):
-            return cont
+    `on_verdict` is called with each `Container` we try and whether the
+    `Parcel`s fit in it, in order of size.
 
-    # Does not fit into any Containers
-    return None
+    With `advanced_packing`, passing a `SpeculativePacker` packs every
+    candidate `Container` concurrently rather than one after the other.
+    """
+    return size_shipment(parcels, advanced_packing, on_verdict, engine,
+                         speculative).container
 
 
-def _can_fit_container_simple(cont: ContainerMeta, parcels: List[ParcelMeta]
-                              ) -> bool:
-    """Uses a naiive approach to determine if we can fit all Parcels in the
-    `Container` based on the `Container`s total volume."""
-    return cont.can_fit_all_by_volume(parcels)
+def size_shipment(
+    parcels: List[ParcelMeta],
+    advanced_packing: bool = False,
+    on_verdict: Optional[Callable[[ContainerMeta, bool], None]] = None,
+    engine: PackingEngine = PackingEngine.EXTREME_POINT,
+    speculative: Optional["SpeculativePacker"] = None,
+    deadline: Optional[float] = None
+) -> Sizing:
+    """Same as `smallest_needed_container`, but packing stops once
+    `time.monotonic()` reaches `deadline`.
+
+    Until then, the bin-packing logic keeps searching for a packing, rather
+    than stopping after a fixed number of attempts. If it runs out of time,
+    we return the first `Container` left that passed the cheap checks,
+    flagged as not `proven`: no packing was found for it, so the `Parcel`s
+    may not actually fit.
+    """
+    if len(parcels) == 0:
+        raise ValueError("Must provide at least one Parcel")
 
+    groups = group_parcels(parcels)
+    parcel_count = sum(g.quantity for g in groups)
+    # Run all of the cheap checks once for the whole ladder of `Container`s,
+    # skipping those too small to ever fit the shipment, so that the
+    # bin-packing logic only runs on `Container`s that pass them
+    ladder = _container_ladder()
+    with stats.timer("prefilter"):
+        start, feasible = ladder.feasible(shipment_totals(groups))
+    stats.count("containers_rejected", start + int((~feasible).sum()))
+    if on_verdict is not None:
+        for cont in ladder.containers[:start]:
+            on_verdict(cont, False)
+
+    # Shipments of a few kinds of `Parcel` may be proven to fit in layers,
+    # without packing them one by one
+    use_grid = (advanced_packing and parcel_count > 1
+                and len(groups) <= grid.MAX_SKUS)
+
+    if speculative is not None and advanced_packing and parcel_count > 1:
+        return _size_speculative(
+            speculative, ladder.containers[start:], feasible, groups,
+            use_grid, engine, on_verdict, deadline)
+
+    # Expanded lazily, then shared by every `Container` we pack
+    boxes: List[Box] = []
+    proven = True
+    for cont, meets_basic_reqs in zip(ladder.containers[start:], feasible):
+        fits = False
+        if meets_basic_reqs and use_grid and _grid_fits(cont, groups):
+            fits = True
+        elif meets_basic_reqs:
+            if advanced_packing and parcel_count > 1 and not boxes:
+                with stats.timer("expand"):
+                    boxes = to_boxes(expand_parcels(groups))
+            with stats.timer("pack:%s" % cont.name):
+                fits = _can_fit_container(cont, boxes, parcel_count,
+                                          advanced_packing, engine,
+                                          deadline=deadline)
+            stats.count("containers_packed")
+            if fits is None:
+                # Out of time, so settle for the cheap checks
+                stats.count("deadline_expired")
+                proven = False
+                fits = True
+        if on_verdict is not None:
+            on_verdict(cont, fits)
+        if fits:
+            return Sizing(cont, proven)
 
-def _can_fit_container_advanced(cont: ContainerMeta, parcels: List[ParcelMeta]
-                                ) -> bool:
+    # Does not fit into any Containers
+    return Sizing(None, proven)
+
+
+def _grid_fits(cont: ContainerMeta, groups: List[ParcelGroupMeta]) -> bool:
+    with stats.timer("grid"):
+        fits = grid.can_fit_container(cont, groups)
+    if fits:
+        stats.count("grid_fits")
+    return fits
+
+
+def _size_speculative(
+    speculative: "SpeculativePacker", containers: List[ContainerMeta],
+    feasible: Sequence[bool], groups: List[ParcelGroupMeta], use_grid: bool,
+    engine: PackingEngine,
+    on_verdict: Optional[Callable[[ContainerMeta, bool], None]],
+    deadline: Optional[float]
+) -> Sizing:
+    """Packs every `Container` that passed the cheap checks at once, see
+    `SpeculativePacker`."""
+    candidates = [cont for cont, ok in zip(containers, feasible) if ok]
+    # Only `Container`s smaller than the first one proven to fit in layers
+    # need packing
+    layered = None
+    if use_grid:
+        layered = next((i for i, cont in enumerate(candidates)
+                        if _grid_fits(cont, groups)), None)
+        if layered is not None:
+            candidates = candidates[:layered + 1]
+            layered = candidates.pop()
+    reported = 0
+
+    def report(cont: Optional[ContainerMeta], fits: bool) -> None:
+        nonlocal reported
+        # `Container`s that failed the cheap checks are reported in order,
+        # on the way to the next candidate
+        while reported < len(containers) and containers[reported] is not cont:
+            on_verdict(containers[reported], False)
+            reported += 1
+        if cont is not None:
+            on_verdict(cont, fits)
+            reported += 1
+
+    sizing = Sizing(None, True)
+    if candidates:
+        with stats.timer("expand"):
+            boxes = to_boxes(expand_parcels(groups))
+        sizing = speculative.smallest_fitting(
+            candidates, boxes, engine, report if on_verdict else None,
+            deadline)
+    if sizing.container is None:
+        sizing = Sizing(layered, True)
+        if on_verdict is not None:
+            report(layered, True)
+    return sizing
+
+
+_ladder: Optional[Tuple[str, ContainerLadder]] = None
+
+
+def _container_ladder() -> ContainerLadder:
+    """Returns the `ContainerLadder` for `CONTAINER_TYPES_BY_SIZE`, only
+    rebuilding it when the catalog changes."""
+    global _ladder
+    version = catalog_version(CONTAINER_TYPES_BY_SIZE)
+    if _ladder is None or _ladder[0] != version:
+        _ladder = (version, ContainerLadder(CONTAINER_TYPES_BY_SIZE))
+    return _ladder[1]
+
+
+def _can_fit_container(cont: ContainerMeta, boxes: List[Box],
+                       parcel_count: int, advanced_packing: bool,
+                       engine: PackingEngine,
+                       should_stop: Optional[Callable[[], bool]] = None,
+                       deadline: Optional[float] = None
+                       ) -> Optional[bool]:
+    """Determines whether all `Parcel`s fit in a `Container` that passed
+    `feasible_containers`.
+
+    Packing gives up, returning None, once `should_stop` returns True or
+    `deadline` is reached, since it neither found a packing nor ruled one
+    out.
+    """
+    if parcel_count == 1:
+        # We already know we can fit the parcel
+        return True
+    if deadline is not None:
+        should_stop = _stop_at_deadline(deadline, should_stop)
+    if advanced_packing and engine == PackingEngine.EXTREME_POINT:
+        return extreme_point.can_fit_container(cont, boxes, should_stop)
+    if advanced_packing:
+        # With a deadline, keep searching for as long as we have time
+        return _can_fit_container_advanced(
+            cont, boxes, iterlimit=None if deadline is not None else 5000,
+            should_stop=should_stop)
+    # Otherwise, we use a naiive approach based on the `Container`'s total
+    # volume, which `feasible_containers` already checked
+    return True
+
+
+def _stop_at_deadline(deadline: float,
+                      should_stop: Optional[Callable[[], bool]] = None
+                      ) -> Callable[[], bool]:
+    """Returns a `should_stop` that also stops once `deadline` is reached."""
+    if should_stop is None:
+        return lambda: time.monotonic() >= deadline
+    return lambda: time.monotonic() >= deadline or should_stop()
+
+
+def _can_fit_container_advanced(
+    cont: ContainerMeta, boxes: List[Box], iterlimit: Optional[int] = 5000,
+    should_stop: Optional[Callable[[], bool]] = None
+) -> Optional[bool]:
     """Uses a more advanced 3D bin-packing solution to determine if we can fit
     all parcels in the `Container` by testing different arrangements and
     orientations of the boxes.
 
-    NOTE: At time of writing, this approach is not reliable and the simple
-    solution should be preferred, instead.
+    All `Compartment`s are packed together, so the orientation search runs
+    once for the whole `Container` rather than once per `Compartment`.
+
+    Returns None if `should_stop` cut the search short.
+
+    NOTE: At time of writing, this approach is not reliable and
+    `PackingEngine.EXTREME_POINT` should be preferred, instead.
     """
-    # Use a greedy approach to calculate if we can fit all parcels into the
-    # compartments, starting by trying to pack all items into the first
-    # compartment, then all remaining parcels into the next, etc.
-    remaining = parcels
-    for compt in cont.compartments:
-        bins, rest = bin_pack(remaining, compt)
-        if rest:
-            break
-        if len(bins) == 1:
-            # We successfully fit all Parcels
-            return True
-        else:
-            # Join overflow bins to get remaining packages
-            remaining = list(itertools.chain.from_iterable(bins[1:]))
-    return False
+    boxes = list(boxes)
+    random.Random(1).shuffle(boxes)
+    search = _ContainerSearch(cont, boxes, iterlimit)
+    search.should_stop = should_stop
+    _search_all(search, boxes, cont.compartments)
+    if not search.optimal and search.stopped:
+        return None
+    return search.optimal
 
 
 """////////////////////////////////////////////////////////////////////////////
@@ -97,163 +296,439 @@ https://github.com/joncombe/pyShipping-python3.
 """
 
 
-class Timeout(Exception):
-    """Exception thrown when we reach either our iteration limit or our optimal
-    solution.
+# The strip/layer heuristic takes `Box`es from a `_Remainder`, in order, and
+# appends those it packs to a list. A `Strip` takes the first `Box` that still
+# fits on top of it, over and over, so rather than scanning every `Box` left
+# for each `Strip`, the `_Remainder` keeps the `Box`es of each height in
+# order and finds the first one low enough with a tree over the heights.
+# Backing out of a `Strip` or `Layer` that doesn't fit puts its `Box`es back
+# in front of the rest, in the same order, where the next one starts.
+
+class _Remainder:
+    """`Box`es left to pack in an attempt, in order.
+
+    The `Box`es are grouped by height, keeping their order within each
+    group, and a cursor over each group marks where the `Box`es left start.
+    `Strip`s and `Layer`s are put back in the reverse order they were taken,
+    so putting a `Box` back only moves the cursor of its group back. Each
+    `Box` is taken and put back at most a few times per attempt, at a cost
+    logarithmic in the number of distinct heights.
     """
-    pass
+    __slots__ = ('heights', 'index', 'boxes', 'positions', 'heads', 'ends',
+                 'leaves', 'tree', 'empty', 'front', 'size')
+
+    def __init__(self, boxes: List[Box]):
+        self.heights = sorted({box.height for box in boxes})
+        self.index = {height: i for i, height in enumerate(self.heights)}
+        # Position of each `Box` in the order, grouped by height
+        self.positions = sorted(range(len(boxes)),
+                                key=lambda position: boxes[position].height)
+        self.boxes = [boxes[position] for position in self.positions]
+        self.heads = []
+        self.ends = []
+        for slot, box in enumerate(self.boxes):
+            if slot == 0 or box.height != self.boxes[slot - 1].height:
+                self.heads.append(slot)
+                self.ends.append(slot)
+            self.ends[-1] += 1
+        # Minimum tree over the first `Box` left of each height, with each
+        # leaf holding `position * leaves + index` so that it sorts by
+        # position and tells which height it is
+        self.leaves = 1
+        while self.leaves < len(self.heights):
+            self.leaves *= 2
+        # Sorts after every `Box`
+        self.empty = (len(boxes) + 1) * self.leaves
+        self.tree = [self.empty] * (2 * self.leaves)
+        for i, head in enumerate(self.heads):
+            self.tree[self.leaves + i] = self.positions[head] * self.leaves + i
+        for node in range(self.leaves - 1, 0, -1):
+            self.tree[node] = min(self.tree[2 * node],
+                                  self.tree[2 * node + 1])
+        # `Box`es put back get positions before every other
+        self.front = 0
+        self.size = len(boxes)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def take(self, max_height: int) -> Optional[Box]:
+        """Removes and returns the first `Box` at most `max_height` tall, if
+        any."""
+        tree = self.tree
+        first = tree[1]
+        if first == self.empty:
+            return None
+        if self.heights[first % self.leaves] > max_height:
+            # Minimum over the leaves of the heights up to `max_height`
+            first = self.empty
+            lo = self.leaves
+            hi = lo + bisect_right(self.heights, max_height)
+            while lo < hi:
+                if lo & 1:
+                    if tree[lo] < first:
+                        first = tree[lo]
+                    lo += 1
+                if hi & 1:
+                    hi -= 1
+                    if tree[hi] < first:
+                        first = tree[hi]
+                lo >>= 1
+                hi >>= 1
+            if first == self.empty:
+                return None
+        i = first % self.leaves
+        head = self.heads[i]
+        self._update(i, head + 1)
+        self.size -= 1
+        return self.boxes[head]
+
+    def put_back(self, packed: List[Box], start: int) -> None:
+        """Moves `packed[start:]`, the last `Box`es taken, back in front of
+        the `Box`es left, in the same order."""
+        while len(packed) > start:
+            i = self.index[packed.pop().height]
+            head = self.heads[i] - 1
+            self.front -= 1
+            self.positions[head] = self.front
+            self._update(i, head)
+            self.size += 1
+
+    def remaining(self) -> List[Box]:
+        """Returns the `Box`es left, in order."""
+        slots = [slot for head, end in zip(self.heads, self.ends)
+                 for slot in range(head, end)]
+        slots.sort(key=self.positions.__getitem__)
+        return [self.boxes[slot] for slot in slots]
+
+    def _update(self, i: int, head: int) -> None:
+        """Moves the cursor over the `Box`es of the `i`th height to
+        `head`."""
+        self.heads[i] = head
+        tree = self.tree
+        node = self.leaves + i
+        tree[node] = (self.positions[head] * self.leaves + i
+                      if head < self.ends[i] else self.empty)
+        # Up to the first node that keeps its minimum
+        while node > 1:
+            node >>= 1
+            left = tree[2 * node]
+            right = tree[2 * node + 1]
+            value = left if left < right else right
+            if tree[node] == value:
+                break
+            tree[node] = value
 
 
-def _pack_strip(compt: CompartmentMeta, parcels: List[ParcelMeta]):
-    """Creates a `Strip` which fits into a `Layer`"""
-    strip = []
-    rest = []
+def _pack_strip(compt: CompartmentMeta, remainder: _Remainder,
+                packed: List[Box]):
+    """Creates a `Strip` which fits into a `Layer` from the `Box`es left,
+    appending them to `packed`. Returns the size of the `Strip`."""
+    compt_height = compt.dims[2]
     strip_length = strip_width = strip_size = 0
-    while parcels and (strip_size <= compt.height):
-        parcel = parcels.pop(0)
-        if strip_size + parcel.height <= compt.height:
-            strip_size += parcel.height
-            strip.append(parcel)
-            strip_width = max(strip_width, parcel.width)
-            strip_length = max(strip_length, parcel.length)
-        else:
-            rest.append(parcel)
-    return strip, (strip_size, strip_width, strip_length), rest + parcels
+    # Nothing else fits once the `Strip` is full
+    while strip_size < compt_height:
+        box = remainder.take(compt_height - strip_size)
+        if box is None:
+            break
+        packed.append(box)
+        strip_size += box.height
+        strip_width = max(strip_width, box.width)
+        strip_length = max(strip_length, box.length)
+    return strip_size, strip_width, strip_length
 
 
-def _pack_layer(compt: CompartmentMeta, parcels: List[ParcelMeta]):
-    """Creates a `Layer` which fits into a `Compartment`"""
-    strips = []
+def _pack_layer(compt: CompartmentMeta, remainder: _Remainder,
+                packed: List[Box]):
+    """Creates a `Layer` which fits into a `Compartment` from the `Box`es
+    left, appending them to `packed`. Returns the size of the `Layer`."""
     layer_size = 0
     layer_x = 0
     layer_y = 0
-    compt_size = compt.width
-    while parcels:
-        strip, (size_x, strip_size, size_z), rest = _pack_strip(compt, parcels)
-        if layer_size + strip_size <= compt_size:
-            parcels = rest
-            if not strip:
-                # Could not pack anything
-                break
-            layer_size += strip_size
-            layer_x = max(size_x, layer_x)
-            layer_y = max(size_z, layer_y)
-            strips.extend(strip)
-        else:
+    compt_size = compt.dims[1]
+    while remainder:
+        start = len(packed)
+        size_x, strip_size, size_z = _pack_strip(compt, remainder, packed)
+        if len(packed) == start:
+            # Could not pack anything
+            break
+        if layer_size + strip_size > compt_size:
             # Next Layer please
-            parcels = strip + rest
+            remainder.put_back(packed, start)
             break
-    return strips, (layer_x, layer_size, layer_y), parcels
-
-
-def _pack_compt(compt: CompartmentMeta, parcels: List[ParcelMeta]):
-    """Attempt to pack `Compartment` with `Parcel`s."""
-    layers = []
+        layer_size += strip_size
+        stats.count("strips_built")
+        layer_x = max(size_x, layer_x)
+        layer_y = max(size_z, layer_y)
+    return layer_x, layer_size, layer_y
+
+
+def _pack_compt(compt: CompartmentMeta, remainder: _Remainder
+                ) -> List[Box]:
+    """Attempt to pack `Compartment` with the `Box`es left, returning those
+    it packed."""
+    packed: List[Box] = []
     content_height = 0
-    content_x = 0
-    content_y = 0
-    compt_size = compt.length
-    while parcels:
-        layer, (size_x, size_y, layer_size), rest = _pack_layer(compt, parcels)
-        if content_height + layer_size <= compt_size:
-            parcels = rest
-            if not layer:
-                # Could not pack anything
-                break
-            content_height += layer_size
-            content_x = max([content_x, size_x])
-            content_y = max([content_y, size_y])
-            layers.extend(layer)
-        else:
+    compt_size = compt.dims[0]
+    while remainder:
+        start = len(packed)
+        _, _, layer_size = _pack_layer(compt, remainder, packed)
+        if len(packed) == start:
+            # Could not pack anything
+            break
+        if content_height + layer_size > compt_size:
             # Next Bin please
-            parcels = layer + rest
+            remainder.put_back(packed, start)
             break
-    return layers, (content_x, content_y, content_height), parcels
+        content_height += layer_size
+        stats.count("layers_built")
+    return packed
 
 
-def _pack_it(compt: CompartmentMeta, parcels: List[ParcelMeta]
-             ) -> Tuple[List[CompartmentMeta], List[ParcelMeta]]:
+def _pack_it(compt: CompartmentMeta, parcels: List[Box]
+             ) -> Tuple[List[List[Box]], List[Box]]:
     """Attempt to pack `Compartment` with `Parcel`s, prioritizing `Parcel`s by
     their volume."""
     packed_compts = []
-    remaining_parcels = sorted(parcels, key=lambda x: x.volume)
-    while remaining_parcels:
-        parcels_in_bin, (bin_x, bin_y, bin_z), rest = (
-                _pack_compt(compt, remaining_parcels))
-        if not parcels_in_bin:
+    with stats.timer("sort"):
+        remainder = _Remainder(sorted(parcels, key=lambda x: x.volume))
+    while remainder:
+        packed = _pack_compt(compt, remainder)
+        if not packed:
             # Could not pack anything
             break
-        packed_compts.append(parcels_in_bin)
-        remaining_parcels = rest
-    return packed_compts, rest
-
-
-def _try_pack(compt: CompartmentMeta, parcels: List[ParcelMeta],
-              best_pack: Dict) -> int:
-    """Perform a basic best-attempt pack"""
-    compts, rest = _pack_it(compt, parcels)
-    if len(compts) < best_pack['compt_count']:
-        best_pack['compt_count'] = len(compts)
-        best_pack['compts'] = compts
-        best_pack['rest'] = rest
-    if best_pack['compt_count'] < 2:
-        raise Timeout('optimal solution found')
-    return len(parcels)
-
-
-def _all_permutations_helper(permuted: List[ParcelMeta],
-                             todo: List[ParcelMeta], iterlimit: int,
-                             compt: CompartmentMeta,
-                             best_pack: Dict, counter) -> int:
-    """Attempt to pack `Parcel`s using all possible orientations"""
-    if not todo:
-        return counter + _try_pack(compt, permuted, best_pack)
-    else:
-        others = todo[1:]
-        parcel = todo[0]
-        # This is the most important difference between pyshipping and our
-        # algorithm. We only allow certain parcel rotations.
-        for orientation in parcel.legal_orientations():
-            l, w, h = orientation
-            # This could later be refactored to use tuples instead of objects
-            rotated_parcel = ParcelMeta(l, w, h, parcel.weight)
-            if compt.can_fit(rotated_parcel):
-                counter = _all_permutations_helper(
-                        permuted + [rotated_parcel], others, iterlimit, compt,
-                        best_pack, counter)
-            if counter > iterlimit:
-                raise Timeout("Iteration limit reached (%d)" % counter)
-        return counter
-
-
-def _all_permutations(todo: List[ParcelMeta], compt: CompartmentMeta,
-                      iterlimit: int = 5000
-                      ) -> Tuple[List[List[ParcelMeta]], List[ParcelMeta]]:
+        packed_compts.append(packed)
+    return packed_compts, remainder.remaining()
+
+
+def _pack_container(compts: List[CompartmentMeta], parcels: List[Box]
+                    ) -> Tuple[List[List[Box]], List[Box]]:
+    """Attempt to pack each `Compartment` of a `Container` in turn,
+    prioritizing `Parcel`s by their volume. Each `Compartment` picks up the
+    `Parcel`s left over by the previous one, in the same sorted order."""
+    with stats.timer("sort"):
+        remainder = _Remainder(sorted(parcels, key=lambda x: x.volume))
+    packed_compts = [_pack_compt(compt, remainder) for compt in compts]
+    return packed_compts, remainder.remaining()
+
+
+class _Search:
+    """State of the orientation search in `bin_pack`.
+
+    The search stops once it has packed `budget` `Parcel`s in total across
+    all attempts, or once it finds a packing that uses as few `Compartment`s
+    as `lower_bound`, which is then known to be optimal. Without a `budget`,
+    it runs until `should_stop` returns True or it runs out of orientations
+    to try.
+
+    `lower_bound` only terminates the search early, it never prunes a
+    branch: turning a `Box` swaps its length and width but keeps its height
+    and volume, so the bound is the same for every orientation and no
+    subtree can be ruled out ahead of packing it.
+    """
+    __slots__ = ('compt', 'budget', 'nodes', 'lower_bound', 'best_score',
+                 'best_compts', 'best_rest', 'should_stop', 'stopped')
+
+    def __init__(self, compt: Optional[CompartmentMeta], boxes: List[Box],
+                 budget: Optional[int], lower_bound: Optional[int] = None):
+        self.compt = compt
+        self.budget = budget
+        self.nodes = 0
+        if lower_bound is None:
+            lower_bound = _lower_bound(compt, boxes)
+        self.lower_bound = lower_bound
+        self.best_score = None
+        self.best_compts = []
+        self.best_rest = boxes
+        # Called after each attempt, the search stops once it returns True
+        self.should_stop: Optional[Callable[[], bool]] = None
+        # Whether `should_stop` ended the search
+        self.stopped = False
+
+    @property
+    def optimal(self) -> bool:
+        return self.best_score == (0, self.lower_bound)
+
+    @property
+    def done(self) -> bool:
+        if self.optimal or (self.budget is not None
+                            and self.nodes >= self.budget):
+            return True
+        if self.should_stop is not None and self.should_stop():
+            self.stopped = True
+        return self.stopped
+
+    def try_pack(self, boxes: List[Box]) -> None:
+        """Perform a basic best-attempt pack, keeping it if it is the best
+        so far."""
+        self.nodes += len(boxes)
+        stats.count("orientations_tried")
+        compts, rest = self._pack(boxes)
+        # Prefer leaving fewer `Parcel`s unpacked, then fewer `Compartment`s
+        score = (len(rest), len(compts))
+        if self.best_score is None or score < self.best_score:
+            self.best_score = score
+            self.best_compts = compts
+            self.best_rest = rest
+
+    def _pack(self, boxes: List[Box]) -> Tuple[List[List[Box]], List[Box]]:
+        return _pack_it(self.compt, boxes)
+
+
+class _ContainerSearch(_Search):
+    """State of the orientation search across every `Compartment` of a
+    `Container`.
+
+    Each attempt fills one of each of the `Container`'s `Compartment`s, so it
+    is optimal as soon as it leaves no `Parcel`s unpacked.
+    """
+    __slots__ = ('compts',)
+
+    def __init__(self, cont: ContainerMeta, boxes: List[Box],
+                 budget: Optional[int]):
+        super().__init__(None, boxes, budget,
+                         lower_bound=len(cont.compartments))
+        self.compts = cont.compartments
+
+    def _pack(self, boxes: List[Box]) -> Tuple[List[List[Box]], List[Box]]:
+        return _pack_container(self.compts, boxes)
+
+
+def _lower_bound(compt: CompartmentMeta, boxes: List[Box]) -> int:
+    """Returns a lower bound on the number of `Compartment`s needed to pack
+    all `Box`es, in any orientation. `_Search` stops early once it reaches
+    it."""
+    compt_length, compt_width, compt_height = compt.dims
+    volume = sum(box.volume for box in boxes)
+    volume_bound = -(-volume // max(compt.volume_units, 1))
+    # `Box`es taller than half the `Compartment` can't be stacked on top of
+    # each other, so each needs its own floor space
+    tall_area = sum(box.length * box.width for box in boxes
+                    if 2 * box.height > compt_height)
+    area_bound = -(-tall_area // max(compt_length * compt_width, 1))
+    return max(1, volume_bound, area_bound)
+
+
+class _ShapeClass(NamedTuple):
+    """`Box`es with identical dimensions, and where they appear in the list
+    being packed."""
+    base: Box
+    positions: List[int]
+    # How many of the `Box`es may be turned, each option is a branch
+    turned_counts: List[int]
+
+
+def _shape_classes(compts: List[CompartmentMeta], boxes: List[Box]
+                   ) -> List[_ShapeClass]:
+    """Groups the `Box`es by shape, for breaking the symmetry between
+    identical `Parcel`s. An orientation is only tried if it fits in one of
+    `compts`."""
+    positions_by_shape: Dict[Tuple[int, int, int], List[int]] = {}
+    bases = {}
+    for i, box in enumerate(boxes):
+        # Use the same base orientation for every `Box` of a shape
+        base = box if box.length <= box.width else box.rotated()
+        shape = (base.length, base.width, base.height)
+        positions_by_shape.setdefault(shape, []).append(i)
+        bases.setdefault(shape, base)
+
+    classes = []
+    for shape, positions in positions_by_shape.items():
+        base = bases[shape]
+        turned = base.rotated()
+        fits = [any(box.length <= length and box.width <= width
+                    and box.height <= height
+                    for length, width, height in (c.dims for c in compts))
+                for box in (base, turned)]
+        if turned is base or not fits[1]:
+            turned_counts = [0]
+        elif not fits[0]:
+            turned_counts = [len(positions)]
+        else:
+            turned_counts = list(range(len(positions) + 1))
+        classes.append(_ShapeClass(base, positions, turned_counts))
+    return classes
+
+
+def _search_orientations(search: _Search, boxes: List[Box],
+                         classes: List[_ShapeClass], depth: int = 0) -> None:
+    """Attempt to pack `Parcel`s using all possible orientations, modifying
+    `boxes` in place.
+
+    This is the most important difference between pyshipping and our
+    algorithm. We only allow certain parcel rotations. Identical `Parcel`s
+    are interchangeable, so rather than trying every combination of their
+    orientations we only branch on how many of them are turned.
+
+    Every branch is explored in turn until `search` is done, see `_Search`
+    for when that is.
+    """
+    if depth == len(classes):
+        search.try_pack(boxes)
+        return
+    shape_class = classes[depth]
+    turned = shape_class.base.rotated()
+    for turned_count in shape_class.turned_counts:
+        for i, position in enumerate(shape_class.positions):
+            boxes[position] = turned if i < turned_count else shape_class.base
+        _search_orientations(search, boxes, classes, depth + 1)
+        if search.done:
+            return
+
+
+def _all_permutations(todo: List[Box], compt: CompartmentMeta,
+                      iterlimit: Optional[int] = 5000,
+                      deadline: Optional[float] = None) -> _Search:
     """Attempt to find a basic best-attempt pack, followed by a pack using all
     `Parcel`s' orientations"""
-    random.seed(1)
-    random.shuffle(todo)
-    best_pack = dict(compt_count=len(todo) + 1)
-    try:
+    todo = list(todo)
+    random.Random(1).shuffle(todo)
+    search = _Search(compt, todo, iterlimit)
+    if deadline is not None:
+        search.should_stop = _stop_at_deadline(deadline)
+    _search_all(search, todo, [compt])
+    return search
+
+
+def _search_all(search: _Search, todo: List[Box],
+                compts: List[CompartmentMeta]) -> None:
+    """Runs the search, modifying `todo` in place."""
+    with stats.timer("search"):
         # First try unpermuted
-        _try_pack(compt, todo, best_pack)
-        # Now try permutations
-        _all_permutations_helper([], todo, iterlimit, compt, best_pack, 0)
-    except Timeout:
-        pass
-    return best_pack['compts'], best_pack['rest']
+        search.try_pack(list(todo))
+        if not search.done:
+            # Now try permutations
+            _search_orientations(search, todo, _shape_classes(compts, todo))
+    # Why the search stopped
+    if search.optimal:
+        stats.count("search_optimal")
+    elif search.budget is not None and search.nodes >= search.budget:
+        stats.count("search_budget_exhausted")
+    elif search.stopped:
+        stats.count("search_stopped")
+    else:
+        stats.count("search_exhausted")
 
 
 def bin_pack(parcels: List[ParcelMeta], compt: CompartmentMeta,
-             iterlimit: int = 5000
+             iterlimit: Optional[int] = 5000,
+             deadline: Optional[float] = None
              ) -> Tuple[List[List[ParcelMeta]], List[ParcelMeta]]:
     """Attempts to pack the `Parcel`s into multiple `Compartment`s of the same
     size. We know we can fit all `Parcel`s in the `Container` when we receive a
     list of `Container`s == 1 and no `Parcel`s remaining to pack.
+
+    The search over orientations stops after packing `iterlimit` `Parcel`s in
+    total, so its cost is deterministic. With a `deadline`, it also stops once
+    `time.monotonic()` reaches it, returning the best packing found so far,
+    and `iterlimit` may be None to keep searching until then.
     """
     if not parcels:
         raise ValueError("must provide at least one package")
     if not compt:
         raise ValueError("compt cannot be None")
-    compts, rest = _all_permutations(parcels, compt, iterlimit)
-    return compts, rest
+    if iterlimit is None and deadline is None:
+        raise ValueError("must provide an iterlimit or a deadline")
+    search = _all_permutations(to_boxes(parcels), compt, iterlimit, deadline)
+    return ([to_parcels(boxes) for boxes in search.best_compts],
+            to_parcels(search.best_rest))
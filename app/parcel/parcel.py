@@ -1,9 +1,11 @@
 from decimal import Decimal
 from dataclasses import field
-from typing import Set, Tuple
+from typing import Dict, List, Set, Tuple
 
 from pydantic.dataclasses import dataclass
 
+from .units import to_units
+
 
 @dataclass
 class ParcelMeta:
@@ -17,13 +19,28 @@ class ParcelMeta:
     height: Decimal
     weight: Decimal
     volume: Decimal = field(init=False)
+    # Dimensions, weight and volume in integer `units`, used by the fit checks
+    # and the packing engine
+    dims: Tuple[int, int, int] = field(init=False, repr=False, compare=False)
+    weight_units: int = field(init=False, repr=False, compare=False)
+    volume_units: int = field(init=False, repr=False, compare=False)
 
     def __post_init__(self):
+        self._set_derived()
+
+    def _set_derived(self):
         # BUG: For some reason we have to reinitialize each as Decimals to
         # retain our precision?
         self.volume = (
             Decimal(self.length) * Decimal(self.width) * Decimal(self.height)
         )
+        # NOTE: This runs before pydantic validates our fields, so the values
+        # may not be Decimals yet
+        l, w, h = (to_units(self.length), to_units(self.width),
+                   to_units(self.height))
+        self.dims = (l, w, h)
+        self.weight_units = to_units(self.weight)
+        self.volume_units = l * w * h
 
     def legal_orientations(self) -> Set[Tuple[float, float, float]]:
         """Returns all viable orientations for the `Parcel` when placed in a
@@ -32,3 +49,77 @@ class ParcelMeta:
         l, w, h = self.length, self.width, self.height
         # Parcels must be placed upright
         return {(l, w, h), (w, l, h)}
+
+
+@dataclass
+class ParcelGroupMeta(ParcelMeta):
+    """Meta class for storing a group of identical `Parcel`s.
+
+    Shipments are described per SKU, so rather than expanding each line into
+    `quantity` separate `ParcelMeta`s we keep a single record and scale its
+    weight and volume by the count.
+    """
+    quantity: int = 1
+
+    @classmethod
+    def construct(cls, length: Decimal, width: Decimal, height: Decimal,
+                  weight: Decimal, quantity: int = 1) -> "ParcelGroupMeta":
+        """Builds a group from values that were already validated, like
+        pydantic's `BaseModel.construct`. Validation takes far longer than
+        the rest, so use this for records checked in bulk."""
+        group = cls.__new__(cls)
+        group.length, group.width, group.height = length, width, height
+        group.weight = weight
+        group.quantity = quantity
+        group._set_derived()
+        return group
+
+    @property
+    def total_weight(self) -> Decimal:
+        return self.weight * self.quantity
+
+    @property
+    def total_volume(self) -> Decimal:
+        return self.volume * self.quantity
+
+    def expand(self) -> List[ParcelMeta]:
+        """Returns one `ParcelMeta` per unit in the group, for use with the
+        bin-packing logic which places each `Parcel` individually.
+        """
+        parcel = ParcelMeta(self.length, self.width, self.height, self.weight)
+        return [parcel] * self.quantity
+
+
+def group_parcels(parcels: List[ParcelMeta]) -> List[ParcelGroupMeta]:
+    """Merges `Parcel`s with the same dimensions and weight into
+    `ParcelGroupMeta`s. Groups that are passed in keep their quantities.
+    """
+    groups: Dict[Tuple[Decimal, ...], List] = {}
+    for p in parcels:
+        key = (p.length, p.width, p.height, p.weight)
+        quantity = p.quantity if isinstance(p, ParcelGroupMeta) else 1
+        if key in groups:
+            groups[key][1] += quantity
+        else:
+            groups[key] = [p, quantity]
+    result = []
+    for key, (first, quantity) in groups.items():
+        if isinstance(first, ParcelGroupMeta) and first.quantity == quantity:
+            # Already grouped, avoid rebuilding the record
+            result.append(first)
+        else:
+            result.append(ParcelGroupMeta(*key, quantity=quantity))
+    return result
+
+
+def expand_parcels(parcels: List[ParcelMeta]) -> List[ParcelMeta]:
+    """Inverse of `group_parcels`, returns a flat list with one `ParcelMeta`
+    per unit.
+    """
+    expanded = []
+    for p in parcels:
+        if isinstance(p, ParcelGroupMeta):
+            expanded.extend(p.expand())
+        else:
+            expanded.append(p)
+    return expanded
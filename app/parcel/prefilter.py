@@ -0,0 +1,155 @@
+import itertools
+from bisect import bisect_left
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+
+from .container import ContainerMeta
+from .parcel import ParcelGroupMeta
+
+
+def _compartment_arrays(containers: List[ContainerMeta]):
+    """Returns an (M, 3) array of (short side, long side, height) for every
+    `Compartment` of the `Container`s, along with the index of the first
+    `Compartment` of each `Container` and the `Container`s that have any."""
+    dims = []
+    starts = []
+    has_compartments = []
+    for cont in containers:
+        starts.append(len(dims))
+        has_compartments.append(bool(cont.compartments))
+        for compt in cont.compartments:
+            l, w, h = compt.dims
+            dims.append((min(l, w), max(l, w), h))
+    return (np.array(dims, dtype=np.int64).reshape(-1, 3),
+            np.array(starts, dtype=np.intp),
+            np.array(has_compartments, dtype=bool))
+
+
+class ShipmentTotals(NamedTuple):
+    """Aggregates of a shipment, computed once and compared against every
+    `Container`.
+
+    The API accepts arbitrarily large `Parcel`s, so these are all Python
+    ints, only turned into arrays once they are known to fit the catalog.
+    """
+    # (short side, long side, height, weight) per group
+    parcels: List[Tuple[int, int, int, int]]
+    max_weight: int
+    total_weight: int
+    volume: int
+    # Largest (short side, long side, height) of any `Parcel`
+    max_dims: Tuple[int, int, int]
+
+
+def shipment_totals(groups: List[ParcelGroupMeta]) -> ShipmentTotals:
+    # Parcels must be upright, so a `Parcel` fits a `Compartment` exactly when
+    # its sorted footprint fits the `Compartment`'s sorted footprint.
+    parcels = [(min(g.dims[0], g.dims[1]), max(g.dims[0], g.dims[1]),
+                g.dims[2], g.weight_units) for g in groups]
+    return ShipmentTotals(
+        parcels,
+        max_weight=max((p[3] for p in parcels), default=0),
+        total_weight=sum(g.weight_units * g.quantity for g in groups),
+        volume=sum(g.volume_units * g.quantity for g in groups),
+        max_dims=tuple(max((p[axis] for p in parcels), default=0)
+                       for axis in range(3)))
+
+
+class ContainerLadder:
+    """`Container`s in order of size, with their capacities precomputed.
+
+    Capacities don't always grow along the ladder, so we also keep their
+    running maxima. A shipment can't fit in any `Container` before the first
+    whose running maxima admit it, which we find by bisecting, so the
+    remaining checks only run on the `Container`s from there on.
+
+    Along with weights and volume, we index the largest (short side, long
+    side, height) of each `Container`'s `Compartment`s, which every `Parcel`
+    must fit within.
+    """
+
+    def __init__(self, containers: List[ContainerMeta]):
+        self.containers = list(containers)
+        self.max_single_weight = np.array(
+            [c.max_single_weight_units for c in containers], dtype=np.int64)
+        # Kept as Python ints, see `shipment_totals`
+        self.max_total_weight = [c.max_total_weight_units for c in containers]
+        self.volume = [c.volume_units for c in containers]
+        # Running maxima are kept as Python ints, see `shipment_totals`
+        self._max_single_weight = list(itertools.accumulate(
+            (int(w) for w in self.max_single_weight), max))
+        self._max_total_weight = list(
+            itertools.accumulate(self.max_total_weight, max))
+        self._max_volume = list(itertools.accumulate(self.volume, max))
+        self.compts, self.starts, self.has_compartments = (
+            _compartment_arrays(containers))
+        max_dims = np.zeros((len(containers), 3), dtype=np.int64)
+        has_compartments = self.has_compartments
+        if len(self.compts):
+            max_dims[has_compartments] = np.maximum.reduceat(
+                self.compts, self.starts[has_compartments], axis=0)
+        self._max_dims = [
+            [int(d) for d in axis]
+            for axis in np.maximum.accumulate(max_dims, axis=0).T]
+
+    def __len__(self) -> int:
+        return len(self.containers)
+
+    def first_candidate(self, totals: ShipmentTotals) -> int:
+        """Returns the index of the first `Container` that could fit the
+        shipment by weight, volume and size, or `len(self)` if none can."""
+        return max(
+            bisect_left(self._max_single_weight, totals.max_weight),
+            bisect_left(self._max_total_weight, totals.total_weight),
+            bisect_left(self._max_volume, totals.volume),
+            *(bisect_left(self._max_dims[axis], totals.max_dims[axis])
+              for axis in range(3)))
+
+    def feasible(self, totals: ShipmentTotals) -> Tuple[int, np.ndarray]:
+        """Returns the index of the first candidate `Container`, along with a
+        boolean mask over the `Container`s from there on of those that pass
+        every cheap check for the shipment. See `feasible_containers`."""
+        start = self.first_candidate(totals)
+        if start == len(self):
+            return start, np.zeros(0, dtype=bool)
+        # Every `Parcel` is within the largest capacities from `start` on, so
+        # it fits in an int64
+        parcels = np.array(totals.parcels, dtype=np.int64).reshape(-1, 4)
+        mask = ((totals.max_weight <= self.max_single_weight[start:])
+                & self.has_compartments[start:])
+        mask &= np.array([totals.total_weight <= max_total_weight
+                          for max_total_weight
+                          in self.max_total_weight[start:]], dtype=bool)
+        mask &= np.array([totals.volume <= volume
+                          for volume in self.volume[start:]], dtype=bool)
+
+        offset = self.starts[start]
+        compts = self.compts[offset:]
+        if len(compts):
+            has_compartments = self.has_compartments[start:]
+            starts = self.starts[start:][has_compartments] - offset
+            # (N, M) whether each `Parcel` fits in each `Compartment`
+            fits = ((parcels[:, None, 0] <= compts[None, :, 0])
+                    & (parcels[:, None, 1] <= compts[None, :, 1])
+                    & (parcels[:, None, 2] <= compts[None, :, 2]))
+            # Whether each `Parcel` fits in any of a `Container`'s
+            # `Compartment`s, skipping `Container`s without any as reduceat
+            # can't handle them
+            fits_container = np.logical_or.reduceat(fits, starts, axis=1)
+            mask[has_compartments] &= fits_container.all(axis=0)
+        return start, mask
+
+
+def feasible_containers(groups: List[ParcelGroupMeta],
+                        containers: List[ContainerMeta]) -> np.ndarray:
+    """Returns a boolean mask over `containers` of those that pass every cheap
+    check for the `Parcel`s: weight limits, every `Parcel` fitting in one of
+    the `Compartment`s on its own and the total volume.
+
+    These checks are necessary but not sufficient, so `Container`s that pass
+    may still need to be checked by the bin-packing logic.
+    """
+    start, mask = ContainerLadder(containers).feasible(
+        shipment_totals(groups))
+    return np.concatenate([np.zeros(start, dtype=bool), mask])
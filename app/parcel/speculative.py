@@ -0,0 +1,149 @@
+"""////////////////////////////////////////////////////////////////////////////
+
+Speculative evaluation of candidate `Container`s.
+
+Rather than packing each `Container` in turn, every candidate that passed the
+cheap checks is packed at once in a pool of worker processes. We still wait on
+the candidates in order of size, so the smallest `Container` that fits wins,
+at which point the work left on larger `Container`s is cancelled. Pending work
+is simply dropped, while running work is stopped by a flag shared with the
+workers, which the packing logic checks as it goes.
+
+///////////////////////////////////////////////////////////////////////////////
+"""
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+from . import packer
+from .box import Box
+from .container import ContainerMeta
+
+# Set in worker processes by `_init_worker`
+_cancel_flags = None
+
+
+def _init_worker(cancel_flags) -> None:
+    global _cancel_flags
+    _cancel_flags = cancel_flags
+
+
+def _evaluate(slot: int, cont: ContainerMeta, boxes: List[Box],
+              engine: packer.PackingEngine, deadline: Optional[float]
+              ) -> Optional[bool]:
+    """Packs a single candidate `Container` in a worker process, see
+    `packer._can_fit_container`."""
+    if _cancel_flags[slot]:
+        return None
+    return packer._can_fit_container(
+        cont, boxes, len(boxes), True, engine,
+        should_stop=lambda: bool(_cancel_flags[slot]), deadline=deadline)
+
+
+def _verdict(cont: ContainerMeta, fits: Optional[bool],
+             on_verdict: Optional[Callable[[ContainerMeta, bool], None]]
+             ) -> Optional[packer.Sizing]:
+    """Reports whether a candidate fits, returning the result once we are
+    done. When packing was cut short, `fits` is None and we settle for the
+    cheap checks, returning an unproven guess, see `packer.size_shipment`."""
+    proven = fits is not None
+    if on_verdict is not None:
+        on_verdict(cont, fits is not False)
+    if fits is not False:
+        return packer.Sizing(cont, proven)
+    return None
+
+
+class SpeculativePacker:
+    """Pool of worker processes packing candidate `Container`s concurrently.
+
+    Each call to `smallest_fitting` claims one of `max_runs` cancellation
+    flags for as long as any of its work is still running. Once they are all
+    taken, candidates are packed one at a time in the calling process.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None,
+                 max_runs: int = 256):
+        self._cancel_flags = multiprocessing.RawArray('b', max_runs)
+        self._free_slots = list(range(max_runs))
+        self._lock = threading.Lock()
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker,
+            initargs=(self._cancel_flags,))
+
+    def smallest_fitting(
+        self, candidates: List[ContainerMeta], boxes: List[Box],
+        engine: packer.PackingEngine,
+        on_verdict: Optional[Callable[[ContainerMeta, bool], None]] = None,
+        deadline: Optional[float] = None
+    ) -> packer.Sizing:
+        """Returns the first of `candidates`, in order, that all `Box`es can
+        be packed into, or None if none of them can.
+
+        `on_verdict` is called with each candidate in order, up to the one
+        that fits. Past the `deadline`, the next candidate is returned as not
+        proven, an unverified guess, see `packer.size_shipment`.
+        """
+        if not candidates:
+            return packer.Sizing(None, True)
+        slot = self._claim_slot()
+        if slot is None:
+            return self._smallest_fitting_serial(
+                candidates, boxes, engine, on_verdict, deadline)
+
+        futures = [self._executor.submit(
+                       _evaluate, slot, cont, boxes, engine, deadline)
+                   for cont in candidates]
+        self._release_when_done(slot, futures)
+        try:
+            for cont, future in zip(candidates, futures):
+                sizing = _verdict(cont, future.result(), on_verdict)
+                if sizing is not None:
+                    return sizing
+            return packer.Sizing(None, True)
+        finally:
+            # Cancel the work on larger `Container`s, including on errors
+            self._cancel_flags[slot] = 1
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops all worker processes, along with any work left."""
+        # Pending work is still handed to the workers, which return at once
+        with self._lock:
+            self._free_slots = []
+        for slot in range(len(self._cancel_flags)):
+            self._cancel_flags[slot] = 1
+        self._executor.shutdown(wait=wait)
+
+    def _smallest_fitting_serial(self, candidates, boxes, engine, on_verdict,
+                                 deadline):
+        for cont in candidates:
+            fits = packer._can_fit_container(
+                cont, boxes, len(boxes), True, engine, deadline=deadline)
+            sizing = _verdict(cont, fits, on_verdict)
+            if sizing is not None:
+                return sizing
+        return packer.Sizing(None, True)
+
+    def _claim_slot(self) -> Optional[int]:
+        with self._lock:
+            if not self._free_slots:
+                return None
+            slot = self._free_slots.pop()
+        self._cancel_flags[slot] = 0
+        return slot
+
+    def _release_when_done(self, slot: int, futures: List[Future]) -> None:
+        """Frees the slot once none of its work can read the flag anymore."""
+        remaining = [len(futures)]
+
+        def on_done(_):
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    self._free_slots.append(slot)
+
+        for future in futures:
+            future.add_done_callback(on_done)
@@ -0,0 +1,70 @@
+"""////////////////////////////////////////////////////////////////////////////
+
+Optional instrumentation of the packing pipeline.
+
+Within `collect()`, the packing logic records how long each stage took and
+counts what it did, such as the orientations tried or the layers and strips
+built. Outside of it, recording is a single check for whether anything is
+being collected, so the packing logic can be instrumented freely.
+
+Stats are collected per process: work done by a `SpeculativePacker`'s workers
+is not included.
+
+///////////////////////////////////////////////////////////////////////////////
+"""
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+
+class PackingStats:
+    """Timers and counters recorded while sizing a shipment."""
+
+    def __init__(self):
+        # Seconds spent per stage
+        self.timers: Dict[str, float] = defaultdict(float)
+        self.counters: Dict[str, int] = Counter()
+
+    def as_dict(self) -> Dict[str, Dict]:
+        """Returns the stats as JSON serializable dicts, with times in
+        milliseconds."""
+        return {"timers_ms": {stage: seconds * 1000
+                              for stage, seconds in self.timers.items()},
+                "counters": dict(self.counters)}
+
+
+# Stats being collected in this process, see `collect`
+_current: Optional[PackingStats] = None
+
+
+@contextmanager
+def collect() -> Iterator[PackingStats]:
+    """Collects stats for the packing done within the block."""
+    global _current
+    previous, _current = _current, PackingStats()
+    try:
+        yield _current
+    finally:
+        _current = previous
+
+
+def count(name: str, n: int = 1) -> None:
+    """Adds `n` to a counter, if stats are being collected."""
+    if _current is not None:
+        _current.counters[name] += n
+
+
+@contextmanager
+def timer(stage: str) -> Iterator[None]:
+    """Adds the time spent within the block to `stage`, if stats are being
+    collected."""
+    stats = _current
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.timers[stage] += time.perf_counter() - start
@@ -0,0 +1,36 @@
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal, localcontext
+
+# Dimensions and weights are converted once into integer multiples of 1/SCALE
+# so that packing and fit checks can use plain int arithmetic, which is both
+# exact and much faster than Decimal. Matches the 4 decimal places of
+# precision we accept at the API.
+SCALE = 10 ** 4
+
+
+def to_units(value, rounding: str = ROUND_CEILING) -> int:
+    """Converts a dimension or weight to an integer number of units.
+
+    Values with more precision than `SCALE` are rounded up by default, so that
+    `Parcel`s are never considered smaller than they are. Use `ROUND_FLOOR`
+    for capacities.
+    """
+    if isinstance(value, float):
+        # Avoid picking up the binary representation error of floats
+        value = str(value)
+    # The global context only keeps 10 significant digits
+    with localcontext() as ctx:
+        ctx.prec = 50
+        return int((Decimal(value) * SCALE).to_integral_value(rounding))
+
+
+def capacity_units(value) -> int:
+    """Converts a capacity (e.g. a `Compartment` dimension or a maximum
+    weight) to units, rounding down."""
+    return to_units(value, ROUND_FLOOR)
+
+
+def from_units(units: int) -> Decimal:
+    """Converts an integer number of units back to a Decimal."""
+    with localcontext() as ctx:
+        ctx.prec = 50
+        return Decimal(units) / SCALE
@@ -0,0 +1,19 @@
+from ..parcel.box import to_boxes, to_parcels
+from ..parcel.parcel import ParcelMeta
+
+
+def test_boxes():
+    parcel = ParcelMeta(3, 4, 5, 10)
+    square_parcel = ParcelMeta(3, 3, 5, 10)
+    boxes = to_boxes([parcel, parcel, square_parcel])
+
+    # Repeated parcels share their `Box`
+    assert boxes[0] is boxes[1]
+    # Rotating swaps length and width without building a new `Box`
+    turned = boxes[0].rotated()
+    assert (turned.length, turned.width) == (boxes[0].width, boxes[0].length)
+    assert turned.rotated() is boxes[0]
+    assert boxes[2].rotated() is boxes[2]
+
+    assert to_parcels([boxes[0]]) == [parcel]
+    assert to_parcels([turned]) == [ParcelMeta(4, 3, 5, 10)]
@@ -0,0 +1,77 @@
+import pytest
+
+from ..parcel.cache import (MISSING, ResultCache, SQLiteResultCache,
+                            create_result_cache, shipment_key)
+from ..parcel.container import CompartmentMeta, ContainerMeta
+from ..parcel.parcel import ParcelGroupMeta, ParcelMeta
+
+
+def test_shipment_key():
+    parcel = ParcelMeta(1, 2, 3, 4)
+    other_parcel = ParcelMeta(5, 5, 5, 1)
+    key = shipment_key([parcel, parcel, other_parcel])
+
+    # Order, grouping, rotation and representation don't matter
+    assert key == shipment_key([other_parcel, parcel, parcel])
+    assert key == shipment_key([ParcelGroupMeta(2, 1, 3, 4, quantity=2),
+                                ParcelMeta(5.0, 5, 5, 1)])
+    # Quantities and packing method do
+    assert key != shipment_key([parcel, other_parcel])
+    assert key != shipment_key([parcel, parcel, other_parcel],
+                               advanced_packing=True)
+
+
+def test_result_cache():
+    containers = [ContainerMeta('test', [CompartmentMeta(1, 1, 1)], 1, 1)]
+    cache = ResultCache(containers, max_size=2)
+    assert cache.get("a") is MISSING
+    cache.put("a", "test")
+    cache.put("b", None)
+    assert cache.get("b") is None
+    assert cache.get("a") == "test"
+
+    # Least recently used result is evicted
+    cache.put("c", "test")
+    assert cache.get("b") is MISSING
+    assert len(cache) == 2
+
+    # Changing the catalog invalidates all results
+    containers.append(ContainerMeta('test2', [CompartmentMeta(2, 2, 2)], 1, 1))
+    assert cache.get("a") is MISSING
+    assert len(cache) == 0
+
+
+def test_sqlite_result_cache(tmp_path):
+    path = str(tmp_path / "results.db")
+    containers = [ContainerMeta('test', [CompartmentMeta(1, 1, 1)], 1, 1)]
+    cache = SQLiteResultCache(path, containers, max_size=2)
+    assert cache.get("a") is MISSING
+    cache.put("a", "test")
+    cache.put("b", None)
+    assert cache.get("b") is None
+    assert cache.get("a") == "test"
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    # Shared with other processes, and across restarts
+    other = SQLiteResultCache(path, containers, max_size=2)
+    assert other.get("a") == "test"
+
+    # Least recently used result is evicted
+    cache.put("c", "test")
+    assert cache.get("b") is MISSING
+    assert len(cache) == 2
+
+    # Results are only returned for the catalog they were computed for
+    changed = containers + [
+        ContainerMeta('test2', [CompartmentMeta(2, 2, 2)], 1, 1)]
+    assert SQLiteResultCache(path, changed).get("a") is MISSING
+    assert other.get("a") == "test"
+
+
+def test_create_result_cache(tmp_path):
+    assert type(create_result_cache("memory", [])) is ResultCache
+    cache = create_result_cache("sqlite:///%s" % (tmp_path / "results.db"),
+                                [])
+    assert isinstance(cache, SQLiteResultCache)
+    with pytest.raises(ValueError):
+        create_result_cache("redis://localhost", [])
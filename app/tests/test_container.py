@@ -1,5 +1,11 @@
-from ..parcel.container import ContainerMeta, CompartmentMeta
-from ..parcel.parcel import ParcelMeta
+import json
+
+import pytest
+
+from ..parcel.container import (COMPACT, DEFAULT_CONTAINER_TYPES, SEDAN,
+                                TRUCK, VAN, ContainerMeta, CompartmentMeta,
+                                load_catalog)
+from ..parcel.parcel import ParcelGroupMeta, ParcelMeta
 
 TEST_COMPARTMENT_SMALL = CompartmentMeta(10, 20, 30)
 TEST_COMPARTMENT_LARGE = CompartmentMeta(40, 50, 60)
@@ -79,3 +85,59 @@ def test_can_fit_all_by_volume():
     assert not TEST_CONTAINER.can_fit_all_by_volume([medium_parcel] * 127)
     assert TEST_CONTAINER2.can_fit_all_by_volume([unit_parcel_float] * 101)
     assert not TEST_CONTAINER2.can_fit_all_by_volume([unit_parcel_float] * 102)
+
+
+def test_parcel_groups():
+    small_group = ParcelGroupMeta(10, 10, 10, 1, quantity=126)
+    heavy_group = ParcelGroupMeta(1, 1, 1, 10, quantity=11)
+    tall_group = ParcelGroupMeta(5, 5, 70, 1, quantity=2)
+
+    # Groups behave the same as their expanded `Parcel`s
+    assert TEST_CONTAINER.can_fit_all_by_volume([small_group])
+    assert not TEST_CONTAINER.can_fit_all_by_volume(
+        [small_group, ParcelMeta(10, 10, 10, 1)])
+    assert not TEST_CONTAINER.can_carry_all_by_weight([heavy_group])
+    assert TEST_CONTAINER.can_carry_all_by_weight(heavy_group.expand()[:10])
+    assert not TEST_CONTAINER.can_fit_all_individually([small_group,
+                                                        tall_group])
+
+
+def _write_catalog(tmp_path, containers):
+    path = tmp_path / "containers.json"
+    path.write_text(json.dumps({"containers": containers}))
+    return str(path)
+
+
+def test_load_catalog(tmp_path):
+    path = _write_catalog(tmp_path, [
+        {"name": "big", "compartments": [
+            {"length": 10, "width": 10, "height": 10}],
+         "max_single_weight": 5, "max_total_weight": 50},
+        {"name": "small", "compartments": [
+            {"length": 1.5, "width": 2, "height": 3},
+            {"length": 1, "width": 1, "height": 1}],
+         "max_single_weight": 5, "max_total_weight": 50},
+    ])
+
+    small, big = load_catalog(path)
+    # Sorted by capacity, rather than by their order in the file
+    assert (small.name, big.name) == ("small", "big")
+    assert small.compartments[0] == CompartmentMeta(1.5, 2, 3)
+    assert small.volume_units == (
+        sum(c.volume_units for c in small.compartments))
+
+
+def test_load_catalog_duplicate_names(tmp_path):
+    container = {"name": "dupe", "compartments": [],
+                 "max_single_weight": 5, "max_total_weight": 50}
+    path = _write_catalog(tmp_path, [container, container])
+
+    with pytest.raises(ValueError):
+        load_catalog(path)
+
+
+def test_default_catalog():
+    assert DEFAULT_CONTAINER_TYPES == [COMPACT, SEDAN, VAN, TRUCK]
+    assert SEDAN == ContainerMeta(
+        'sedan', [CompartmentMeta(24, 24, 36), CompartmentMeta(24, 24, 48)],
+        50, 250, cost=60)
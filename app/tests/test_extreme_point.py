@@ -0,0 +1,152 @@
+import random
+
+from ..parcel import extreme_point, packer
+from ..parcel.box import to_boxes
+from ..parcel.container import SEDAN, CompartmentMeta
+from ..parcel.parcel import ParcelMeta
+
+
+def _no_overlaps(placements):
+    spaces = [(p.x, p.y, p.z, p.x + p.box.length, p.y + p.box.width,
+               p.z + p.box.height) for p in placements]
+    for i, a in enumerate(spaces):
+        for b in spaces[i + 1:]:
+            assert not all(a[k] < b[k + 3] and b[k] < a[k + 3]
+                           for k in range(3))
+
+
+def test_pack_compartment_perfect_fit():
+    """Same inputs as test_bin_pack_complex, packed without any gaps."""
+    compt = CompartmentMeta(5, 4, 3)
+    parcels = [
+        ParcelMeta(4, 3, 2, 1),
+        ParcelMeta(1, 3, 3, 1),
+        ParcelMeta(4, 3, 1, 1),
+        ParcelMeta(2, 1, 3, 1),
+        ParcelMeta(3, 1, 3, 1),
+    ]
+
+    placements, rest = extreme_point.pack_compartment(
+        compt, to_boxes(parcels))
+
+    assert not rest
+    assert len(placements) == len(parcels)
+    _no_overlaps(placements)
+
+
+def test_pack_compartment_rest():
+    compt = CompartmentMeta(4, 4, 4)
+    boxes = to_boxes([ParcelMeta(2, 2, 2, 1)] * 9)
+
+    placements, rest = extreme_point.pack_compartment(compt, boxes)
+
+    assert len(placements) == 8
+    assert len(rest) == 1
+    _no_overlaps(placements)
+    length, width, height = compt.dims
+    for p in placements:
+        assert p.x + p.box.length <= length
+        assert p.y + p.box.width <= width
+        assert p.z + p.box.height <= height
+
+
+def test_pack_compartment_rotates():
+    compt = CompartmentMeta(2, 6, 1)
+    # Only fits side by side once turned
+    boxes = to_boxes([ParcelMeta(3, 2, 1, 1)] * 2)
+
+    placements, rest = extreme_point.pack_compartment(compt, boxes)
+
+    assert not rest
+    assert all(p.box.is_turned for p in placements)
+
+
+def test_grid():
+    grid = extreme_point._Grid((10, 10, 10))
+    grid.add((0, 0, 0, 4, 4, 4))
+
+    assert grid.overlaps((3, 3, 3, 5, 5, 5))
+    assert not grid.overlaps((4, 0, 0, 6, 4, 4))
+    # Corners of the placed space relative to the points, (0, 0, 0) when
+    # they are inside of it
+    assert grid.near((1, 1, 1), (5, 5, 5)) == [(0, 0, 0)]
+    assert grid.near((0, 2, 6), (5, 5, 4)) == []
+    assert grid.near((2, 2, 0), (2, 2, 2)) == [(0, 0, 0)]
+    assert grid.near((4, 0, 0), (6, 6, 6)) == []
+    assert grid.near((0, 3, 5), (5, 5, 5)) == []
+    assert grid.near((0, 0, 4), (5, 5, 5)) == []
+    # Projecting back along x stops at the face of the placed space
+    assert grid.project((8, 2, 2), 0) == 4
+    # Nothing below the point along y, so it drops to the wall
+    assert grid.project((8, 6, 2), 1) == 0
+
+
+def test_largest_spaces():
+    # Nothing in the way
+    assert extreme_point._largest_spaces((4, 4, 4), []) == [(4, 4, 4)]
+    # A `Box` starting 2 along x and 1 along y in the way, from 3 up
+    spaces = extreme_point._largest_spaces((4, 4, 4), [(2, 1, 3)])
+    assert sorted(spaces) == [(2, 4, 4), (4, 1, 4), (4, 4, 3)]
+    # A `Box` right at the point leaves no space
+    assert extreme_point._largest_spaces((4, 4, 4), [(0, 0, 0)]) == []
+
+
+def test_pack_compartment_mixed():
+    compt = CompartmentMeta(12, 10, 8)
+    rng = random.Random(0)
+    parcels = [ParcelMeta(rng.randint(1, 5), rng.randint(1, 5),
+                          rng.randint(1, 5), 1) for _ in range(80)]
+
+    placements, rest = extreme_point.pack_compartment(
+        compt, to_boxes(parcels))
+
+    assert len(placements) + len(rest) == len(parcels)
+    _no_overlaps(placements)
+
+
+def test_can_fit_container():
+    cube = ParcelMeta(4, 4, 4, 0.1)
+
+    assert extreme_point.can_fit_container(SEDAN, to_boxes([cube] * 756))
+    assert not extreme_point.can_fit_container(SEDAN, to_boxes([cube] * 757))
+
+
+def test_pack_container():
+    # Too tall for the first `Compartment`, so goes in the second
+    tall = ParcelMeta(24, 24, 40, 1)
+    cube = ParcelMeta(24, 24, 36, 1)
+
+    placements, rest = extreme_point.pack_container(
+        SEDAN, to_boxes([tall, cube]))
+
+    assert not rest
+    assert [len(compt) for compt in placements] == [1, 1]
+    assert placements[1][0].box.height == tall.dims[2]
+
+    _, rest = extreme_point.pack_container(SEDAN, to_boxes([tall] * 2))
+    assert len(rest) == 1
+    assert not extreme_point.can_fit_container(SEDAN, to_boxes([tall] * 2))
+
+
+def test_can_fit_container_stopped():
+    tall = ParcelMeta(24, 24, 40, 1)
+    boxes = to_boxes([tall] * 2)
+
+    # Stopped before packing, so neither fits nor doesn't
+    assert extreme_point.can_fit_container(
+        SEDAN, boxes, should_stop=lambda: True) is None
+
+    # Ruled out before the next check, which would have stopped it
+    checks = []
+    assert extreme_point.can_fit_container(
+        SEDAN, boxes,
+        should_stop=lambda: checks.append(1) or len(checks) > 1) is False
+
+
+def test_smallest_needed_container_engines():
+    parcels = [ParcelMeta(4, 4, 4, 0.1)] * 757
+
+    for engine in packer.PackingEngine:
+        container = packer.smallest_needed_container(
+            parcels, advanced_packing=True, engine=engine)
+        assert container is not SEDAN
@@ -0,0 +1,51 @@
+from ..parcel import extreme_point
+from ..parcel.box import to_boxes
+from ..parcel.container import COMPACT, TRUCK, VAN
+from ..parcel.fleet import plan_fleet
+from ..parcel.parcel import ParcelGroupMeta, expand_parcels
+
+
+def _quantity(parcels):
+    return sum(p.quantity for p in parcels)
+
+
+def test_single_vehicle():
+    plan = plan_fleet([ParcelGroupMeta(1, 1, 1, 1, quantity=3)])
+
+    assert [v.container for v in plan.vehicles] == [COMPACT]
+    assert plan.cost == COMPACT.cost
+    assert not plan.unassigned
+
+
+def test_heavier_than_a_truck():
+    # Only trucks can carry these, and only four at a time
+    plan = plan_fleet([ParcelGroupMeta(10, 10, 10, 450, quantity=9)])
+
+    assert [v.container for v in plan.vehicles] == [TRUCK] * 3
+    assert [_quantity(v.parcels) for v in plan.vehicles] == [4, 4, 1]
+    assert plan.cost == 3 * TRUCK.cost
+
+
+def test_every_parcel_carried():
+    parcels = [ParcelGroupMeta(30, 20, 10, 5, quantity=400),
+               ParcelGroupMeta(12, 12, 12, 2, quantity=300),
+               ParcelGroupMeta(200, 1, 1, 1, quantity=2)]
+    plan = plan_fleet(parcels)
+
+    assert _quantity(plan.unassigned) == 2
+    assert sum(_quantity(v.parcels) for v in plan.vehicles) == 700
+    for vehicle in plan.vehicles:
+        cont = vehicle.container
+        assert (sum(p.weight_units * p.quantity for p in vehicle.parcels)
+                <= cont.max_total_weight_units)
+        assert extreme_point.can_fit_container(
+            cont, to_boxes(expand_parcels(vehicle.parcels)))
+
+
+def test_cheapest_mix():
+    # A single truck carries them all, but two vans are cheaper
+    plan = plan_fleet([ParcelGroupMeta(10, 10, 10, 1, quantity=500)])
+
+    assert [v.container for v in plan.vehicles] == [VAN, VAN]
+    assert [_quantity(v.parcels) for v in plan.vehicles] == [432, 68]
+    assert plan.cost < TRUCK.cost
@@ -0,0 +1,47 @@
+from ..parcel import grid
+from ..parcel.container import CompartmentMeta, ContainerMeta
+from ..parcel.parcel import ParcelGroupMeta
+
+
+def test_layer_capacity():
+    # 5 by 2 in a single orientation
+    assert grid.layer_capacity(10, 4, 2, 2) == 10
+    # Two blocks, 4 turned one way and 3 the other, filling the floor
+    assert grid.layer_capacity(7, 6, 2, 3) == 7
+    assert grid.layer_capacity(7, 6, 3, 2) == 7
+    # Turning square parcels gains nothing
+    assert grid.layer_capacity(7, 6, 3, 3) == 4
+    assert grid.layer_capacity(1, 1, 2, 2) == 0
+
+
+def test_can_fit_container():
+    cont = ContainerMeta('test', [CompartmentMeta(10, 4, 3)], 1000, 1000)
+    # 10 per layer, 3 layers
+    assert grid.can_fit_container(
+        cont, [ParcelGroupMeta(2, 2, 1, 1, quantity=30)])
+    assert not grid.can_fit_container(
+        cont, [ParcelGroupMeta(2, 2, 1, 1, quantity=31)])
+    # A layer of each kind, the tallest first
+    assert grid.can_fit_container(
+        cont, [ParcelGroupMeta(2, 2, 1, 1, quantity=10),
+               ParcelGroupMeta(5, 4, 2, 1, quantity=2)])
+    assert not grid.can_fit_container(
+        cont, [ParcelGroupMeta(2, 2, 1, 1, quantity=11),
+               ParcelGroupMeta(5, 4, 2, 1, quantity=2)])
+
+    # Later compartments pick up the rest
+    cont = ContainerMeta('test', [CompartmentMeta(10, 4, 1),
+                                  CompartmentMeta(2, 2, 2)], 1000, 1000)
+    assert grid.can_fit_container(
+        cont, [ParcelGroupMeta(2, 2, 1, 1, quantity=12)])
+    assert not grid.can_fit_container(
+        cont, [ParcelGroupMeta(2, 2, 1, 1, quantity=13)])
+
+
+def test_too_many_skus():
+    cont = ContainerMeta('test', [CompartmentMeta(100, 100, 100)], 1000,
+                         1000)
+    groups = [ParcelGroupMeta(1, 1, 1, weight)
+              for weight in range(1, grid.MAX_SKUS + 2)]
+    assert grid.can_fit_container(cont, groups[:-1])
+    assert not grid.can_fit_container(cont, groups)
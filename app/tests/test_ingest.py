@@ -0,0 +1,70 @@
+import json
+from decimal import Decimal
+
+import pytest
+
+from ..ingest import IngestError, parse_columnar_json, parse_csv
+from ..parcel.parcel import ParcelGroupMeta
+
+
+def _columns(**overrides):
+    columns = {"length": [20, 1, 1], "width": [20, 1, 1],
+               "height": [30, 1, 1], "weight": [60.5, "0.1", "0.1"],
+               "quantity": [1, 3, 2]}
+    columns.update(overrides)
+    return json.dumps(columns).encode()
+
+
+def test_parse_columnar_json():
+    expected = [ParcelGroupMeta(20, 20, 30, Decimal("60.5"), quantity=1),
+                ParcelGroupMeta(1, 1, 1, Decimal("0.1"), quantity=5)]
+
+    # Identical lines are merged
+    parsed = parse_columnar_json(_columns())
+    assert parsed == expected
+    assert ([(p.dims, p.weight_units, p.volume_units) for p in parsed]
+            == [(p.dims, p.weight_units, p.volume_units) for p in expected])
+
+
+@pytest.mark.parametrize("body", [
+    b"not json",
+    b"[]",
+    json.dumps({"length": [1]}).encode(),
+    _columns(color=["red"] * 3),
+    _columns(length=1),
+    _columns(length=[1, 2]),
+    _columns(length=[], width=[], height=[], weight=[], quantity=[]),
+    _columns(length=[1, "x", 1]),
+    _columns(length=[1, None, 1]),
+    _columns(length=[True] * 3),
+    _columns(length=[20, True, 1]),
+    _columns(quantity=[1, 2, False]),
+    _columns(length=[[1], [1], [1]]),
+    _columns(length=[[1, 2], [1, 2], [1, 2]]),
+    _columns(length=[1, [1], 1]),
+    _columns(quantity=[1, {"n": 1}, 1]),
+    _columns(weight=[1, 0, 1]),
+    _columns(quantity=[1, 1.5, 1]),
+    _columns(quantity=[1, -1, 1]),
+])
+def test_parse_columnar_json_invalid(body):
+    with pytest.raises(IngestError):
+        parse_columnar_json(body)
+
+
+def test_parse_csv():
+    body = (b"quantity, length,width,height,weight\r\n"
+            b"1,20,20,30,60.5\r\n"
+            b"2,1,1,1,0.1\r\n"
+            b"\r\n")
+    assert parse_csv(body) == [
+        ParcelGroupMeta(20, 20, 30, Decimal("60.5"), quantity=1),
+        ParcelGroupMeta(1, 1, 1, Decimal("0.1"), quantity=2)]
+
+    for body in [b"", b"length,width,height,weight,quantity\n",
+                 b"length,width,height,weight,quantity\n1,1,1,1\n",
+                 b"length,width,height,weight,quantity\n1,1,1,inf,1\n",
+                 b"length,width,height,weight,quantity\n1,1,1,1,1.0\n",
+                 b"length,width,height,weight,quantity\n\xff,1,1,1,1\n"]:
+        with pytest.raises(IngestError):
+            parse_csv(body)
@@ -0,0 +1,133 @@
+import sqlite3
+import time
+
+import pytest
+
+from ..job_store import (JobStore, MemoryJobStore, SQLiteJobStore,
+                         create_job_store)
+from ..jobs import Job, JobStatus, new_job_id
+
+
+def _job(status=JobStatus.COMPLETE, result=None):
+    job = Job(new_job_id())
+    job.status = status
+    job.result = result
+    return job
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store_factory(request, tmp_path):
+    def factory(**kwargs):
+        if request.param == "memory":
+            return MemoryJobStore(**kwargs)
+        return SQLiteJobStore(str(tmp_path / "jobs.db"), **kwargs)
+    return factory
+
+
+def test_get_and_put(store_factory):
+    store = store_factory()
+    job = _job(result={"vehicle_size": "van"})
+    job.progress.append({"vehicle_size": "compact", "fits": False})
+    store.put(job)
+    stored = store.get(job.job_id)
+    assert stored.status == JobStatus.COMPLETE
+    assert stored.result == {"vehicle_size": "van"}
+    assert stored.progress == [{"vehicle_size": "compact", "fits": False}]
+    assert stored.stats is None
+    assert store.get(new_job_id()) is None
+    assert store.stats() == {"size": 1, "hits": 1, "misses": 1,
+                             "evictions": 0}
+
+
+def test_stats(store_factory):
+    store = store_factory()
+    job = _job(result={"vehicle_size": "van"})
+    job.stats = {"timers_ms": {"pack:van": 1.5}, "counters": {"layers": 2}}
+    store.put(job)
+    assert store.get(job.job_id).stats == job.stats
+
+
+def test_sqlite_adds_stats_column(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE jobs (job_id TEXT PRIMARY KEY,"
+                 " status INTEGER NOT NULL, result TEXT,"
+                 " progress TEXT NOT NULL, finished_at REAL,"
+                 " accessed_at REAL NOT NULL)")
+    conn.close()
+    store = SQLiteJobStore(path)
+    job = _job()
+    job.stats = {"counters": {"layers": 2}}
+    store.put(job)
+    assert store.get(job.job_id).stats == job.stats
+
+
+def test_evicts_least_recently_used(store_factory):
+    store = store_factory(max_size=2)
+    first, second, third = _job(), _job(), _job()
+    store.put(first)
+    time.sleep(0.01)
+    store.put(second)
+    time.sleep(0.01)
+    store.get(first.job_id)
+    time.sleep(0.01)
+    store.put(third)
+    assert store.get(second.job_id) is None
+    assert store.get(first.job_id) is not None
+    assert store.get(third.job_id) is not None
+    assert store.stats()["evictions"] == 1
+
+
+def test_never_evicts_running(store_factory):
+    store = store_factory(max_size=1)
+    running = [_job(JobStatus.RUNNING) for _ in range(3)]
+    for job in running:
+        store.put(job)
+    assert len(store) == 3
+    assert all(store.get(job.job_id) is not None for job in running)
+
+
+def test_evicts_finished_running_job(store_factory):
+    store = store_factory(max_size=1)
+    job = _job(JobStatus.RUNNING)
+    store.put(job)
+    time.sleep(0.01)
+    store.put(_job(JobStatus.RUNNING))
+    time.sleep(0.01)
+    job.status = JobStatus.COMPLETE
+    store.put(job)
+    assert store.get(job.job_id) is None
+    assert len(store) == 1
+    assert store.stats()["evictions"] == 1
+
+
+def test_job_store_is_abstract():
+    with pytest.raises(TypeError):
+        JobStore()
+
+
+def test_evicts_expired(store_factory):
+    store = store_factory(ttl=0.05)
+    finished, running = _job(), _job(JobStatus.RUNNING)
+    store.put(finished)
+    store.put(running)
+    time.sleep(0.1)
+    assert store.get(finished.job_id) is None
+    assert store.get(running.job_id) is not None
+
+
+def test_sqlite_shared(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    job = _job(result={"vehicle_size": "truck"})
+    SQLiteJobStore(path).put(job)
+    # A second store, e.g. in another worker, sees the same jobs
+    assert SQLiteJobStore(path).get(job.job_id).result == {
+        "vehicle_size": "truck"}
+
+
+def test_create_job_store(tmp_path):
+    assert isinstance(create_job_store("memory"), MemoryJobStore)
+    assert isinstance(create_job_store(f"sqlite:///{tmp_path}/jobs.db"),
+                      SQLiteJobStore)
+    with pytest.raises(ValueError):
+        create_job_store("redis://localhost")
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+from ..jobs import (Job, JobRunner, JobStatus, QueueFullError, new_job_id,
+                    report_progress, report_stats)
+
+
+def _count_to(n):
+    for i in range(n):
+        report_progress({"count": i})
+    return n
+
+
+def _with_stats(n):
+    report_stats({"counters": {"n": n}})
+    return n
+
+
+def _wait(future):
+    future.result(timeout=5)
+    # Give the done callback a moment to update the `Job`
+    time.sleep(0.05)
+
+
+def test_runner_complete():
+    runner = JobRunner(max_workers=1, max_queue=2)
+    job = Job(new_job_id())
+    _wait(runner.submit(job, pow, 2, 10))
+    assert job.status == JobStatus.COMPLETE
+    assert job.result == 1024
+    assert runner.pending == 0
+    runner.shutdown()
+
+
+def test_runner_failed():
+    runner = JobRunner(max_workers=1, max_queue=2)
+    job = Job(new_job_id())
+    with pytest.raises(ValueError):
+        _wait(runner.submit(job, int, "not a number"))
+    time.sleep(0.05)
+    assert job.status == JobStatus.FAILED
+    assert "error" in job.result
+    runner.shutdown()
+
+
+def test_runner_queue_full():
+    runner = JobRunner(max_workers=1, max_queue=1)
+    future = runner.submit(Job(new_job_id()), time.sleep, 0.2)
+    assert runner.available == 0
+    with pytest.raises(QueueFullError):
+        runner.submit(Job(new_job_id()), time.sleep, 0.2)
+    _wait(future)
+    # Capacity is released once the first `Job` finishes
+    _wait(runner.submit(Job(new_job_id()), time.sleep, 0))
+    runner.shutdown()
+
+
+def test_runner_progress():
+    updates = []
+    runner = JobRunner(
+        max_workers=1, max_queue=1,
+        on_progress=lambda job: updates.append(job.progress[-1]))
+    job = Job(new_job_id())
+    assert runner.submit(job, _count_to, 3).result(timeout=5) == 3
+    # All progress is recorded by the time the `Job` completes
+    assert job.status == JobStatus.COMPLETE
+    assert job.progress == [{"count": 0}, {"count": 1}, {"count": 2}]
+    assert updates == job.progress
+    runner.shutdown()
+
+    # Outside of a worker, progress is ignored
+    report_progress({"count": 0})
+
+
+def test_runner_stats():
+    runner = JobRunner(max_workers=1, max_queue=1)
+    job = Job(new_job_id())
+    assert runner.submit(job, _with_stats, 3).result(timeout=5) == 3
+    assert job.stats == {"counters": {"n": 3}}
+    # Stats don't carry over to the worker's next `Job`
+    job = Job(new_job_id())
+    _wait(runner.submit(job, pow, 2, 10))
+    assert job.stats is None
+    runner.shutdown()
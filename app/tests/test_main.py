@@ -1,8 +1,12 @@
+import gc
+import json
 import time
+from concurrent.futures import Future
 from typing import Dict
 
 from starlette.testclient import TestClient
 
+from .. import main
 from ..main import app, JOB_FINAL_STATES, JobStatus
 
 client = TestClient(app)
@@ -100,6 +104,14 @@ def test_very_heavy_package():
     _assert_vehicle_size_response(request, 200, JobStatus.COMPLETE, None)
 
 
+def test_huge_package():
+    # Beyond the range of int64 once converted to units
+    for dims in [(1e15, 1, 1, 1), (1, 1, 1, 1e15)]:
+        request = [dict(zip(("length", "width", "height", "weight"), dims),
+                        quantity=1)]
+        _assert_vehicle_size_response(request, 200, JobStatus.COMPLETE, None)
+
+
 def test_many_packages():
     # Single request with large quantity
 
@@ -120,3 +132,297 @@ def test_many_packages():
     request = [{"length": 8, "width": 8, "height": 4, "weight": 0.001,
                 "quantity": 1}] * 190  # too much for sedan
     _assert_vehicle_size_response(request, 200, JobStatus.COMPLETE, "van")
+
+
+def test_large_quantity():
+    # Quantities are aggregated rather than expanded per unit
+    request = [{"length": 1, "width": 1, "height": 1, "weight": 0.001,
+                "quantity": 50000}]
+    _assert_vehicle_size_response(request, 200, JobStatus.COMPLETE, "van")
+
+
+def test_queue_full(monkeypatch):
+    monkeypatch.setattr(main.runner, "max_queue", 0)
+    request = [{"length": 1, "width": 1, "height": 1, "weight": 5,
+                "quantity": 3}]
+    response = client.post("/vehicle_size", json=request)
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+
+def test_cached_result():
+    request = [{"length": 2, "width": 3, "height": 4, "weight": 5,
+                "quantity": 2}]
+    _assert_vehicle_size_response(request, 200, JobStatus.COMPLETE, "compact")
+
+    # Same shipment, split and reordered, is answered without a job
+    request = [{"length": 3, "width": 2, "height": 4, "weight": 5,
+                "quantity": 1}] * 2
+    response = client.post("/vehicle_size", json=request)
+    assert response.status_code == 200
+    assert response.json() == {"vehicle_size": "compact"}
+
+
+def test_wait_for_result():
+    request = [{"length": 3, "width": 4, "height": 5, "weight": 6,
+                "quantity": 7}]
+    response = client.post("/vehicle_size?wait_ms=5000", json=request)
+    assert response.status_code == 200
+    assert response.json() == {"vehicle_size": "compact"}
+
+    response = client.post("/vehicle_size?wait_ms=100000", json=request)
+    assert response.status_code == 422
+
+
+def test_deadline():
+    request = [{"length": 3, "width": 4, "height": 6, "weight": 6,
+                "quantity": 7}]
+    response = client.post("/vehicle_size?wait_ms=5000&deadline_ms=5000",
+                           json=request)
+    assert response.status_code == 200
+    assert response.json() == {"vehicle_size": "compact", "proven": True}
+
+    # Proven results are cached
+    response = client.post("/vehicle_size?deadline_ms=5000", json=request)
+    assert response.json() == {"vehicle_size": "compact", "proven": True}
+    response = client.post("/vehicle_size", json=request)
+    assert response.json() == {"vehicle_size": "compact"}
+
+    response = client.post("/vehicle_size?deadline_ms=0", json=request)
+    assert response.status_code == 422
+
+
+def test_batch():
+    small = [{"length": 5, "width": 6, "height": 7, "weight": 1,
+              "quantity": 2}]
+    heavy = [{"length": 5, "width": 6, "height": 7, "weight": 60,
+              "quantity": 1}]
+    response = client.post("/vehicle_size/batch",
+                           json=[small, heavy, small])
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results) == 3
+    # Identical shipments share a `Job`
+    assert results[0] == results[2]
+    assert results[0] != results[1]
+
+    for result, expected_size in zip(results, ["compact", "van"]):
+        if "job_id" in result:
+            # Jobs that finish before we respond are returned directly
+            job_response = _job(result["job_id"])
+            for _ in range(10):
+                if job_response.json()["job_status"] in JOB_FINAL_STATES:
+                    break
+                time.sleep(0.1)
+                job_response = _job(result["job_id"])
+            result = job_response.json()["job_result"]
+        assert result == {"vehicle_size": expected_size}
+
+
+def test_batch_wait_for_result():
+    small = [{"length": 5, "width": 6, "height": 8, "weight": 1,
+              "quantity": 2}]
+    heavy = [{"length": 5, "width": 6, "height": 8, "weight": 60,
+              "quantity": 1}]
+    response = client.post("/vehicle_size/batch?wait_ms=5000",
+                           json=[small, heavy])
+    assert response.status_code == 200
+    assert response.json()["results"] == [{"vehicle_size": "compact"},
+                                          {"vehicle_size": "van"}]
+
+
+def test_batch_queue_full(monkeypatch):
+    monkeypatch.setattr(main.runner, "max_queue", 1)
+    shipments = [[{"length": 5, "width": 6, "height": 9, "weight": 1,
+                   "quantity": quantity}] for quantity in (1, 2)]
+    response = client.post("/vehicle_size/batch", json=shipments)
+    assert response.status_code == 503
+
+
+def test_batch_failed_job(monkeypatch, caplog):
+    def dispatch_job(job_id, func, *args):
+        main.job_store.put(main.Job(job_id))
+        future = Future()
+        future.set_exception(ValueError("Packing failed"))
+        return future
+
+    monkeypatch.setattr(main, "dispatch_job", dispatch_job)
+    request = [{"length": 3, "width": 5, "height": 7, "weight": 11,
+                "quantity": 17}]
+    response = client.post("/vehicle_size/batch?wait_ms=100", json=[request])
+    assert "job_id" in response.json()["results"][0]
+    # The failure is the `Job`'s to report, not left to asyncio to log
+    gc.collect()
+    assert "never retrieved" not in caplog.text
+
+
+def test_job_stream():
+    request = [{"length": 20, "width": 20, "height": 31, "weight": 60,
+                "quantity": 1}]
+    job_id = client.post("/vehicle_size", json=request).json()["job_id"]
+    response = client.get(f"/job/{job_id}/stream")
+    assert response.status_code == 200
+    updates = [json.loads(line) for line in response.text.splitlines()]
+
+    progress = [u["progress"] for u in updates if "progress" in u]
+    assert progress == [{"vehicle_size": "compact", "fits": False},
+                        {"vehicle_size": "sedan", "fits": False},
+                        {"vehicle_size": "van", "fits": True}]
+    assert updates[-1] == {"job_id": job_id,
+                           "job_status": JobStatus.COMPLETE,
+                           "job_result": {"vehicle_size": "van"}}
+
+    response = client.get(f"/job/{main.new_job_id()}/stream")
+    assert response.status_code == 404
+
+
+def test_fleet():
+    # Too heavy for a single truck
+    request = [{"length": 10, "width": 10, "height": 10, "weight": 450,
+                "quantity": 5},
+               {"length": 1000, "width": 1, "height": 1, "weight": 1,
+                "quantity": 1}]
+    response = client.post("/fleet?wait_ms=5000", json=request)
+    assert response.status_code == 200
+    result = response.json()
+    assert [v["vehicle_size"] for v in result["vehicles"]] == [
+        "truck", "truck"]
+    assert [v["parcels"][0]["quantity"] for v in result["vehicles"]] == [
+        4, 1]
+    assert result["total_cost"] == 600
+    assert result["unassigned"] == [request[1]]
+
+
+def test_fleet_too_large(monkeypatch):
+    monkeypatch.setattr(main, "FLEET_MAX_PARCELS", 5)
+    request = [{"length": 10, "width": 10, "height": 10, "weight": 1,
+                "quantity": 3}] * 2
+    response = client.post("/fleet", json=request)
+    assert response.status_code == 422
+
+    # A single line may be over it too
+    response = client.post("/fleet",
+                           json=[{**request[0], "quantity": 10 ** 9}])
+    assert response.status_code == 422
+
+
+def test_job_stats():
+    request = [{"length": 13, "width": 13, "height": 36, "weight": 1,
+                "quantity": 3}]
+    job_response = _poll_vehicle_size(request)
+    job_id = job_response.json()["job_id"]
+    assert job_response.json()["job_result"] == {"vehicle_size": "van"}
+
+    response = client.get(f"/job/{job_id}?include_stats=true")
+    assert response.status_code == 200
+    job_stats = response.json()["job_stats"]
+    assert job_stats["counters"]["containers_packed"] == 2
+    assert job_stats["counters"]["grid_fits"] == 1
+    assert "pack:compact" in job_stats["timers_ms"]
+
+
+def test_metrics():
+    _assert_vehicle_size_response(
+        [{"length": 5, "width": 6, "height": 7, "weight": 1, "quantity": 9}],
+        200, JobStatus.COMPLETE, "compact")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    lines = response.text.splitlines()
+    assert any(line.startswith('packing_jobs_total{status="complete"} ')
+               for line in lines)
+    assert any(line.startswith('packing_stage_seconds_total{stage="pack:')
+               for line in lines)
+    assert "# TYPE result_cache_hits_total counter" in lines
+
+
+def _hold_jobs(monkeypatch):
+    """Dispatches `Job`s that only finish once their `Future` is resolved."""
+    futures = []
+
+    def dispatch_job(job_id, func, *args):
+        main.job_store.put(main.Job(job_id))
+        futures.append(Future())
+        return futures[-1]
+
+    monkeypatch.setattr(main, "dispatch_job", dispatch_job)
+    return futures
+
+
+def test_coalesce_in_flight(monkeypatch):
+    futures = _hold_jobs(monkeypatch)
+    request = [{"length": 3, "width": 5, "height": 7, "weight": 11,
+                "quantity": 13}]
+    job_id = client.post("/vehicle_size", json=request).json()["job_id"]
+    # Identical shipments share the running `Job`
+    assert client.post("/vehicle_size", json=request[::-1]).json() == {
+        "job_id": job_id}
+    response = client.post("/vehicle_size/batch", json=[request])
+    assert response.json() == {"results": [{"job_id": job_id}]}
+    assert len(futures) == 1
+
+    # Results with a deadline may not be proven, so they get their own `Job`
+    response = client.post("/vehicle_size?deadline_ms=1000", json=request)
+    assert response.json()["job_id"] != job_id
+    assert len(futures) == 2
+
+    # Once the `Job` finishes, its result is cached instead
+    futures[0].set_result({"vehicle_size": "compact"})
+    assert client.post("/vehicle_size", json=request).json() == {
+        "vehicle_size": "compact"}
+    assert len(futures) == 2
+    assert "packing_requests_coalesced_total 2" in client.get(
+        "/metrics").text.splitlines()
+
+
+def test_idempotency_key(monkeypatch):
+    futures = _hold_jobs(monkeypatch)
+    request = [{"length": 3, "width": 5, "height": 7, "weight": 11,
+                "quantity": 17}]
+    headers = {"Idempotency-Key": "order-17"}
+    response = client.post("/vehicle_size?deadline_ms=1000", json=request,
+                           headers=headers)
+    job_id = response.json()["job_id"]
+    futures[0].set_result({"vehicle_size": "compact", "proven": True})
+
+    # Retries get the same `Job`, even once it has finished
+    response = client.post("/vehicle_size?deadline_ms=1000", json=request,
+                           headers=headers)
+    assert response.json() == {"job_id": job_id}
+    assert len(futures) == 1
+
+    # Reusing the key for another shipment is an error
+    response = client.post("/vehicle_size",
+                           json=[dict(request[0], quantity=1)],
+                           headers=headers)
+    assert response.status_code == 422
+    response = client.post("/vehicle_size", json=request,
+                           headers={"Idempotency-Key": "x" * 256})
+    assert response.status_code == 422
+
+
+def test_columnar():
+    columns = {"length": [20, 1], "width": [20, 1], "height": [30, 1],
+               "weight": [60, 5], "quantity": [1, 3]}
+    response = client.post("/vehicle_size/columnar?wait_ms=5000",
+                           json=columns)
+    assert response.status_code == 200
+    assert response.json() == {"vehicle_size": "van"}
+
+    # Same shipment as CSV, and in the default format, is answered from the
+    # cache
+    body = "length,width,height,weight,quantity\n1,1,1,5,3\n20,20,30,60,1\n"
+    response = client.post("/vehicle_size/columnar", content=body,
+                           headers={"Content-Type": "text/csv"})
+    assert response.json() == {"vehicle_size": "van"}
+    response = client.post("/vehicle_size", json=[
+        {name: values[i] for name, values in columns.items()}
+        for i in range(2)])
+    assert response.json() == {"vehicle_size": "van"}
+
+    response = client.post("/vehicle_size/columnar",
+                           json=dict(columns, quantity=[1, 0]))
+    assert response.status_code == 422
+    response = client.post("/vehicle_size/columnar", content=body,
+                           headers={"Content-Type": "text/plain"})
+    assert response.status_code == 415
@@ -0,0 +1,33 @@
+from ..jobs import Job, JobStatus, new_job_id
+from ..metrics import PackingMetrics
+
+
+def _job(status, stats=None):
+    job = Job(new_job_id())
+    job.status = status
+    job.stats = stats
+    return job
+
+
+def test_render():
+    metrics = PackingMetrics()
+    metrics.record(_job(JobStatus.COMPLETE, {
+        "timers_ms": {"pack:van": 1500.0},
+        "counters": {"layers_built": 2}}))
+    metrics.record(_job(JobStatus.COMPLETE, {
+        "timers_ms": {"pack:van": 500.0},
+        "counters": {"layers_built": 3, 'odd"name': 1}}))
+    metrics.record(_job(JobStatus.FAILED))
+
+    lines = metrics.render(gauges={"packing_jobs_pending": 4},
+                           counters={"result_cache_hits_total": 7}
+                           ).splitlines()
+    assert 'packing_jobs_total{status="complete"} 2' in lines
+    assert 'packing_jobs_total{status="failed"} 1' in lines
+    assert 'packing_stage_seconds_total{stage="pack:van"} 2.0' in lines
+    assert 'packing_events_total{event="layers_built"} 5' in lines
+    assert 'packing_events_total{event="odd\\"name"} 1' in lines
+    assert "# TYPE packing_jobs_pending gauge" in lines
+    assert "packing_jobs_pending 4" in lines
+    assert "# TYPE result_cache_hits_total counter" in lines
+    assert "result_cache_hits_total 7" in lines
@@ -1,10 +1,15 @@
+import time
+
+import pytest
+
 # Import pyshipping to compare results. This is for demonstation only and does
 # not need to be included in future iterations or in prod.
 from pyshipping.package import Package
 from pyshipping.binpack_simple import binpack
 
 from ..parcel import packer
-from ..parcel.container import CompartmentMeta
+from ..parcel.box import to_boxes
+from ..parcel.container import COMPACT, SEDAN, VAN, CompartmentMeta
 from ..parcel.parcel import ParcelMeta
 
 
@@ -38,30 +43,23 @@ def test_pyshipping():
 
 
 def test_bin_pack_float():
-    """The packer still struggles with perfectly fitting dimensions of floating
-    point values. Although we replaced the dimensions of `Parcel` with
-    `Decimal` objects to account for this, more research is needed to fully
-    implement `Decimal` into our final solution. Uncomment this test once we've
-    done that.
-    """
-    pass
-    # """Our API allows for float dimensions. Test that our packing algorithm
-    # handles floats appropriately."""
-    # compt = CompartmentMeta(5.5, 4.4, 3.3)  # volume: 60
-    # small_parcel = ParcelMeta(1.1, 1.1, 1.1, 10)
-    #
-    # # Test basic perfect fit
-    # bins, rest = packer.bin_pack([small_parcel] * 60, compt)
-    # assert len(bins) == 1
-    # assert len(bins[0]) == 60
-    # assert not rest
-    #
-    # # Test just one too many for basic perfect fit
-    # bins, rest = packer.bin_pack([small_parcel] * 61, compt)
-    # assert len(bins) == 2
-    # assert len(bins[0]) == 60
-    # assert len(bins[1]) == 1
-    # assert not rest
+    """Our API allows for float dimensions. Test that our packing algorithm
+    handles floats appropriately."""
+    compt = CompartmentMeta(5.5, 4.4, 3.3)  # volume: 60
+    small_parcel = ParcelMeta(1.1, 1.1, 1.1, 10)
+
+    # Test basic perfect fit
+    bins, rest = packer.bin_pack([small_parcel] * 60, compt)
+    assert len(bins) == 1
+    assert len(bins[0]) == 60
+    assert not rest
+
+    # Test just one too many for basic perfect fit
+    bins, rest = packer.bin_pack([small_parcel] * 61, compt)
+    assert len(bins) == 2
+    assert len(bins[0]) == 60
+    assert len(bins[1]) == 1
+    assert not rest
 
 
 def test_bin_pack_simple():
@@ -102,6 +100,107 @@ def test_bin_pack_simple():
     assert not rest
 
 
+def test_lower_bound():
+    compt = CompartmentMeta(5, 4, 3)  # volume: 60
+    boxes = to_boxes([ParcelMeta(1, 1, 1, 10)] * 61)
+    assert packer._lower_bound(compt, boxes) == 2
+
+    # Tall parcels can't be stacked, so at most 20 fit in a compartment
+    boxes = to_boxes([ParcelMeta(1, 1, 2, 10)] * 21)
+    assert packer._lower_bound(compt, boxes) == 2
+
+
+def test_shape_classes():
+    compt = CompartmentMeta(5, 4, 3)
+    parcel = ParcelMeta(3, 2, 1, 10)
+    boxes = to_boxes([parcel, ParcelMeta(2, 3, 1, 10), parcel,
+                      ParcelMeta(5, 1, 1, 10), ParcelMeta(2, 2, 1, 10)])
+    classes = packer._shape_classes([compt], boxes)
+    assert len(classes) == 3
+    # Identical parcels only branch on how many of them are turned
+    assert classes[0].positions == [0, 1, 2]
+    assert classes[0].turned_counts == [0, 1, 2, 3]
+    # Only fits one way, or looks the same either way
+    assert len(classes[1].turned_counts) == 1
+    assert classes[2].turned_counts == [0]
+
+
+def test_pack_strip_from_remainder():
+    compt = CompartmentMeta(5, 4, 3)
+    boxes = to_boxes([ParcelMeta(1, 1, height, weight) for height, weight
+                      in [(2, 1), (2, 2), (1, 3), (3, 4), (1, 5)]])
+    first, second, third, fourth, fifth = boxes
+    remainder = packer._Remainder(boxes)
+    packed = []
+    strip_size, _, _ = packer._pack_strip(compt, remainder, packed)
+    # The first `Box`es that still fit make the `Strip`, in order
+    assert packed == [first, third]
+    assert remainder.remaining() == [second, fourth, fifth]
+    assert strip_size == compt.dims[2]
+
+    packer._pack_strip(compt, remainder, packed)
+    assert packed == [first, third, second, fifth]
+    # Backing out a `Strip` puts its `Box`es back in front, in order
+    remainder.put_back(packed, 2)
+    assert packed == [first, third]
+    assert remainder.remaining() == [second, fifth, fourth]
+    assert len(remainder) == 3
+
+
+def test_search_stops_when_optimal():
+    compt = CompartmentMeta(5, 4, 3)
+    boxes = to_boxes([ParcelMeta(1, 1, 1, 10)] * 60)
+    search = packer._all_permutations(boxes, compt)
+    assert search.optimal
+    assert search.nodes == 60
+
+
+def test_can_fit_container_advanced():
+    # The tall parcel only fits the second `Compartment`, and the search
+    # runs over both at once
+    tall = ParcelMeta(24, 24, 40, 1)
+    cube = ParcelMeta(24, 24, 36, 1)
+    assert packer._can_fit_container_advanced(SEDAN, to_boxes([tall, cube]))
+    assert not packer._can_fit_container_advanced(
+        SEDAN, to_boxes([tall, tall]))
+    assert not packer._can_fit_container_advanced(SEDAN, to_boxes([cube] * 3))
+    # Cut short, so it neither fits nor doesn't
+    assert packer._can_fit_container_advanced(
+        SEDAN, to_boxes([cube] * 3), should_stop=lambda: True) is None
+
+
+def test_size_shipment_deadline():
+    # Fits in `COMPACT` by volume, but not side by side
+    parcels = [ParcelMeta(13, 13, 36, 1)] * 3
+
+    # Plenty of time, so the result is the same as without a deadline
+    sizing = packer.size_shipment(parcels, advanced_packing=True,
+                                  deadline=time.monotonic() + 60)
+    assert sizing == (VAN, True)
+
+    # Out of time, so we settle for the first `Container` that passes the
+    # cheap checks
+    verdicts = []
+    sizing = packer.size_shipment(
+        parcels, advanced_packing=True, deadline=time.monotonic(),
+        on_verdict=lambda cont, fits: verdicts.append((cont, fits)))
+    assert sizing == (COMPACT, False)
+    assert verdicts == [(COMPACT, True)]
+
+
+def test_bin_pack_deadline():
+    compt = CompartmentMeta(5, 4, 3)
+    parcels = [ParcelMeta(1, 1, 1, 10)] * 60
+
+    bins, rest = packer.bin_pack(parcels, compt, iterlimit=None,
+                                 deadline=time.monotonic() + 60)
+    assert len(bins) == 1
+    assert not rest
+
+    with pytest.raises(ValueError):
+        packer.bin_pack(parcels, compt, iterlimit=None)
+
+
 def test_bin_pack_complex():
     """Unfortunately the packer doesn't yet produce perfect results, so we
     can't handle more complex cases. Uncomment once packer can produce more
@@ -1,4 +1,6 @@
-from ..parcel.parcel import ParcelMeta
+from ..parcel.parcel import (
+    ParcelGroupMeta, ParcelMeta, expand_parcels, group_parcels
+)
 
 
 def test_volume():
@@ -12,3 +14,23 @@ def test_legal_orientations():
     assert len(orientations) == 2
     assert (3, 4, 5) in orientations
     assert (4, 3, 5) in orientations
+
+
+def test_group_totals():
+    group = ParcelGroupMeta(3, 4, 5, 2, quantity=10)
+    assert group.volume == 60
+    assert group.total_volume == 600
+    assert group.total_weight == 20
+    assert len(group.expand()) == 10
+
+
+def test_group_parcels():
+    parcel = ParcelMeta(3, 4, 5, 1)
+    other_parcel = ParcelMeta(4, 3, 5, 1)
+    group = ParcelGroupMeta(3, 4, 5, 1, quantity=5)
+
+    groups = group_parcels([parcel, parcel, other_parcel, group])
+    assert len(groups) == 2
+    assert groups[0].quantity == 7
+    assert groups[1].quantity == 1
+    assert len(expand_parcels(groups)) == 8
@@ -0,0 +1,78 @@
+from ..parcel.container import CompartmentMeta, ContainerMeta
+from ..parcel.parcel import ParcelGroupMeta
+from ..parcel.prefilter import (ContainerLadder, feasible_containers,
+                                shipment_totals)
+
+SMALL = ContainerMeta('small', [CompartmentMeta(10, 20, 30)],
+                      max_single_weight=10, max_total_weight=100)
+SPLIT = ContainerMeta('split', [CompartmentMeta(10, 20, 30),
+                                CompartmentMeta(40, 50, 20)],
+                      max_single_weight=50, max_total_weight=100)
+EMPTY = ContainerMeta('empty', [], max_single_weight=50, max_total_weight=100)
+CONTAINERS = [SMALL, SPLIT, EMPTY]
+
+
+def _feasible(*groups):
+    return list(feasible_containers(list(groups), CONTAINERS))
+
+
+def test_feasible_by_weight():
+    assert _feasible(ParcelGroupMeta(1, 1, 1, 10, quantity=10)) == [
+        True, True, False]
+    # Single weight too high
+    assert _feasible(ParcelGroupMeta(1, 1, 1, 20)) == [False, True, False]
+    # Total weight too high
+    assert _feasible(ParcelGroupMeta(1, 1, 1, 10, quantity=11)) == [
+        False, False, False]
+    # Total weight beyond the range of int64
+    assert _feasible(ParcelGroupMeta(0.0001, 0.0001, 0.0001, 40,
+                                     quantity=3 * 10 ** 13)) == [
+        False, False, False]
+
+
+def test_feasible_by_size():
+    # Only fits when rotated
+    assert _feasible(ParcelGroupMeta(20, 10, 30, 1)) == [True, True, False]
+    # Too tall for the second compartment, too wide for the first
+    assert _feasible(ParcelGroupMeta(45, 30, 5, 1)) == [False, True, False]
+    assert _feasible(ParcelGroupMeta(45, 30, 25, 1)) == [False, False, False]
+    # Each parcel fits in a different compartment
+    assert _feasible(ParcelGroupMeta(10, 20, 30, 1),
+                     ParcelGroupMeta(45, 30, 5, 1)) == [False, True, False]
+
+
+def test_feasible_beyond_int64():
+    # Units are scaled up, so these are beyond the range of int64
+    huge = 10 ** 15
+    assert _feasible(ParcelGroupMeta(huge, 1, 1, 1)) == [False] * 3
+    assert _feasible(ParcelGroupMeta(1, 1, 1, huge)) == [False] * 3
+
+
+def test_feasible_by_volume():
+    assert _feasible(ParcelGroupMeta(10, 10, 10, 0.1, quantity=6)) == [
+        True, True, False]
+    assert _feasible(ParcelGroupMeta(10, 10, 10, 0.1, quantity=7)) == [
+        False, True, False]
+
+
+def test_ladder_first_candidate():
+    big = ContainerMeta('big', [CompartmentMeta(100, 100, 100)],
+                        max_single_weight=100, max_total_weight=1000)
+    ladder = ContainerLadder([SMALL, big, SPLIT])
+
+    def first(*groups):
+        return ladder.first_candidate(shipment_totals(list(groups)))
+
+    assert first(ParcelGroupMeta(1, 1, 1, 10)) == 0
+    # Too heavy for `SMALL`, `SPLIT` is never reached once `big` admits it
+    assert first(ParcelGroupMeta(1, 1, 1, 20)) == 1
+    assert first(ParcelGroupMeta(10, 10, 10, 1, quantity=7)) == 1
+    assert first(ParcelGroupMeta(1, 1, 1, 200)) == 3
+    # Longer than anything in `SMALL`
+    assert first(ParcelGroupMeta(25, 1, 1, 1)) == 1
+    assert first(ParcelGroupMeta(1, 1, 101, 1)) == 3
+
+    start, mask = ladder.feasible(
+        shipment_totals([ParcelGroupMeta(1, 1, 1, 20)]))
+    assert start == 1
+    assert list(mask) == [True, True]
@@ -0,0 +1,58 @@
+import pytest
+
+from ..parcel import packer
+from ..parcel.container import COMPACT, SEDAN, TRUCK, VAN
+from ..parcel.parcel import ParcelGroupMeta
+from ..parcel.speculative import SpeculativePacker
+
+
+@pytest.fixture(scope="module")
+def speculative():
+    speculative = SpeculativePacker(max_workers=2, max_runs=2)
+    yield speculative
+    speculative.shutdown()
+
+
+def _smallest(parcels, speculative):
+    verdicts = []
+    container = packer.smallest_needed_container(
+        parcels, advanced_packing=True, speculative=speculative,
+        on_verdict=lambda cont, fits: verdicts.append((cont, fits)))
+    return container, verdicts
+
+
+def test_matches_serial(speculative):
+    shipments = [
+        [ParcelGroupMeta(4, 4, 4, 0.1, quantity=756)],
+        [ParcelGroupMeta(4, 4, 4, 0.1, quantity=757)],
+        [ParcelGroupMeta(24, 24, 40, 1), ParcelGroupMeta(24, 24, 36, 1)],
+        [ParcelGroupMeta(200, 1, 1, 1, quantity=2)],
+    ]
+    for parcels in shipments:
+        assert _smallest(parcels, speculative) == _smallest(parcels, None)
+
+
+def test_verdicts_in_order(speculative):
+    # Too heavy for `COMPACT` and `SEDAN`, so they are never packed
+    container, verdicts = _smallest(
+        [ParcelGroupMeta(1, 1, 1, 60, quantity=2)], speculative)
+
+    assert container is VAN
+    assert verdicts == [(COMPACT, False), (SEDAN, False), (VAN, True)]
+
+
+def test_slots_reused(speculative):
+    # More runs than slots, each frees its slot once its work is done
+    for _ in range(5):
+        container, _ = _smallest(
+            [ParcelGroupMeta(10, 10, 10, 1, quantity=20)], speculative)
+        assert container is SEDAN
+
+
+def test_no_candidates(speculative):
+    container, verdicts = _smallest(
+        [ParcelGroupMeta(1, 1, 1, 1000, quantity=2)], speculative)
+
+    assert container is None
+    assert verdicts == [(cont, False)
+                        for cont in (COMPACT, SEDAN, VAN, TRUCK)]
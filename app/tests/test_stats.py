@@ -0,0 +1,46 @@
+from ..parcel import grid, packer, stats
+from ..parcel.parcel import ParcelGroupMeta
+
+
+def test_collect():
+    # Nothing is recorded outside of `collect`
+    stats.count("ignored")
+    with stats.timer("ignored"):
+        pass
+
+    with stats.collect() as collected:
+        stats.count("strips_built")
+        stats.count("strips_built", 2)
+        with stats.timer("sort"):
+            pass
+        with stats.collect() as nested:
+            stats.count("layers_built")
+        stats.count("layers_built")
+    assert collected.counters == {"strips_built": 3, "layers_built": 1}
+    assert nested.counters == {"layers_built": 1}
+    result = collected.as_dict()
+    assert list(result["timers_ms"]) == ["sort"]
+    assert result["timers_ms"]["sort"] >= 0
+
+
+def test_packing_stats(monkeypatch):
+    parcels = [ParcelGroupMeta(13, 13, 36, 1, quantity=3)]
+    with stats.collect() as collected:
+        packer.smallest_needed_container(parcels, advanced_packing=True)
+    # Doesn't fit in the compact or the sedan, fits the van in layers
+    assert collected.counters["containers_packed"] == 2
+    assert collected.counters["early_exits:compact"] == 1
+    assert collected.counters["grid_fits"] == 1
+    assert {"prefilter", "expand", "grid", "pack:compact"} <= set(
+        collected.timers)
+
+    monkeypatch.setattr(grid, "MAX_SKUS", 0)
+    with stats.collect() as collected:
+        packer.smallest_needed_container(
+            parcels, advanced_packing=True,
+            engine=packer.PackingEngine.STRIP)
+    assert collected.counters["orientations_tried"] > 0
+    assert collected.counters["layers_built"] > 0
+    assert collected.counters["strips_built"] > 0
+    assert collected.counters["search_optimal"] == 1
+    assert "search" in collected.timers
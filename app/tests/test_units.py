@@ -0,0 +1,21 @@
+from decimal import Decimal
+
+from ..parcel.units import capacity_units, from_units, to_units
+
+
+def test_to_units():
+    assert to_units(1) == 10000
+    assert to_units(1.1) == 11000
+    assert to_units(Decimal("0.0001")) == 1
+    # Large values keep their precision
+    assert to_units(Decimal("123456789.1234")) == 1234567891234
+
+
+def test_rounding():
+    # Parcels round up, capacities round down
+    assert to_units(Decimal("1.00001")) == 10001
+    assert capacity_units(Decimal("1.00009")) == 10000
+
+
+def test_from_units():
+    assert from_units(11000) == Decimal("1.1")
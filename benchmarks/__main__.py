@@ -0,0 +1,128 @@
+"""Runs the benchmarks, optionally storing the results as a baseline or
+comparing them against one.
+
+    $ python -m benchmarks
+    $ python -m benchmarks --save default
+    $ python -m benchmarks --compare default
+"""
+import argparse
+import sys
+import time
+from decimal import Decimal
+from typing import Callable, Dict, List
+
+from app.parcel import packer
+from app.parcel.container import VAN
+from app.parcel.parcel import ParcelGroupMeta, expand_parcels
+
+from . import harness
+from .generators import SHIPMENTS
+
+# Seconds between polls of `/job/{job_id}` in the API round-trip benchmark
+POLL_INTERVAL = 0.001
+
+
+def _vary(shipment: List[ParcelGroupMeta], i: int
+          ) -> List[ParcelGroupMeta]:
+    """Returns the shipment with its first parcel's weight nudged by `i`
+    units, so that repeated calls aren't answered from the result cache."""
+    first = shipment[0]
+    weight = first.weight + Decimal(i) / 10000
+    return [ParcelGroupMeta(first.length, first.width, first.height, weight,
+                            quantity=first.quantity)] + shipment[1:]
+
+
+def _request(shipment: List[ParcelGroupMeta]) -> List[Dict]:
+    return [{"length": str(p.length), "width": str(p.width),
+             "height": str(p.height), "weight": str(p.weight),
+             "quantity": p.quantity}
+            for p in shipment]
+
+
+def _packer_benchmarks() -> Dict[str, Callable[[int], None]]:
+    benchmarks = {}
+    for name, generate in SHIPMENTS.items():
+        shipment = generate()
+        benchmarks["smallest_needed_container[%s]" % name] = (
+            lambda i, s=shipment: packer.smallest_needed_container(s))
+        benchmarks["smallest_needed_container[%s,advanced]" % name] = (
+            lambda i, s=shipment: packer.smallest_needed_container(
+                s, advanced_packing=True))
+        parcels = expand_parcels(shipment)
+        compt = VAN.compartments[0]
+        benchmarks["bin_pack[%s]" % name] = (
+            lambda i, p=parcels: packer.bin_pack(p, compt))
+    return benchmarks
+
+
+def _api_benchmarks() -> Dict[str, Callable[[int], None]]:
+    from starlette.testclient import TestClient
+
+    from app.main import JOB_FINAL_STATES, app
+
+    client = TestClient(app)
+
+    def round_trip(shipment, i):
+        response = client.post("/vehicle_size", json=_request(
+            _vary(shipment, i)))
+        job_id = response.json().get("job_id")
+        while job_id is not None:
+            job = client.get("/job/%s" % job_id).json()
+            if job["job_status"] in JOB_FINAL_STATES:
+                break
+            time.sleep(POLL_INTERVAL)
+
+    return {"api_round_trip[%s]" % name:
+            (lambda i, s=generate(): round_trip(s, i))
+            for name, generate in SHIPMENTS.items()}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="timed calls per benchmark")
+    parser.add_argument("--filter", default="",
+                        help="only run benchmarks containing this string")
+    parser.add_argument("--no-api", action="store_true",
+                        help="skip the API round-trip benchmarks")
+    parser.add_argument("--save", metavar="NAME",
+                        help="store the results as baseline NAME")
+    parser.add_argument("--compare", metavar="NAME",
+                        help="compare the results against baseline NAME")
+    parser.add_argument("--max-regression", type=float, default=0.1,
+                        help="fraction a benchmark may slow down or grow by "
+                             "before it is flagged (default: 0.1)")
+    args = parser.parse_args(argv)
+
+    benchmarks = _packer_benchmarks()
+    if not args.no_api:
+        benchmarks.update(_api_benchmarks())
+
+    results = {}
+    for name, func in benchmarks.items():
+        if args.filter not in name:
+            continue
+        results[name] = harness.measure(func, repeat=args.repeat)
+        print("%-46s %10.2f ms %10.1f KiB" % (
+            name, results[name]["median_ms"], results[name]["peak_kib"]))
+
+    if not args.no_api:
+        from app.main import runner
+        runner.shutdown()
+
+    if args.save:
+        print("Saved baseline to %s" % harness.save_baseline(args.save,
+                                                             results))
+    if args.compare:
+        report = harness.compare(harness.load_baseline(args.compare),
+                                 results, args.max_regression)
+        print()
+        print("\n".join(report))
+        if harness.has_regressions(report):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
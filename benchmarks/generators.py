@@ -0,0 +1,56 @@
+"""Seeded synthetic shipments for benchmarking.
+
+Each generator returns the same shipment for the same arguments, so timings
+can be compared between runs.
+"""
+import random
+from decimal import Decimal
+from typing import Callable, Dict, List
+
+from app.parcel.parcel import ParcelGroupMeta
+
+
+def _dimension(rng: random.Random, low: int, high: int) -> Decimal:
+    # Two decimal places, as shipments usually have
+    return Decimal(rng.randint(low * 100, high * 100)) / 100
+
+
+def _sku(rng: random.Random, quantity: int, max_side: int = 30,
+         max_weight: int = 10) -> ParcelGroupMeta:
+    return ParcelGroupMeta(
+        _dimension(rng, 1, max_side), _dimension(rng, 1, max_side),
+        _dimension(rng, 1, max_side), _dimension(rng, 1, max_weight),
+        quantity=quantity)
+
+
+def uniform(seed: int = 0, skus: int = 50, quantity: int = 4
+            ) -> List[ParcelGroupMeta]:
+    """`skus` distinct parcels of uniformly random size and weight, with the
+    same `quantity` each."""
+    rng = random.Random(seed)
+    return [_sku(rng, quantity) for _ in range(skus)]
+
+
+def long_tail(seed: int = 0, skus: int = 200, top_quantity: int = 100
+              ) -> List[ParcelGroupMeta]:
+    """A few SKUs making up most of the shipment, followed by a long tail of
+    SKUs shipped once or twice. Quantities follow a Zipf-like distribution.
+    """
+    rng = random.Random(seed)
+    return [_sku(rng, max(1, top_quantity // rank), max_side=20,
+                 max_weight=2)
+            for rank in range(1, skus + 1)]
+
+
+def identical(seed: int = 0, quantity: int = 1500) -> List[ParcelGroupMeta]:
+    """Many identical boxes, as in a pallet of a single product."""
+    rng = random.Random(seed)
+    return [_sku(rng, quantity, max_side=10, max_weight=1)]
+
+
+# Shipments used by the benchmarks, by name
+SHIPMENTS: Dict[str, Callable[[], List[ParcelGroupMeta]]] = {
+    "uniform": uniform,
+    "long_tail": long_tail,
+    "identical": identical,
+}
@@ -0,0 +1,118 @@
+"""Timing, memory and baseline comparison for the benchmarks."""
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+BASELINES_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+
+def measure(func: Callable[[int], None], repeat: int = 5,
+            warmup: int = 1) -> Dict[str, float]:
+    """Times `repeat` calls of `func`, then measures the peak memory it
+    allocates in one more call. `func` is passed the index of each call, so
+    that it can vary its input where results are cached.
+
+    Memory is traced separately, as tracing slows down every allocation and
+    would skew the timings.
+    """
+    calls = 0
+    for _ in range(warmup):
+        func(calls)
+        calls += 1
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(calls)
+        timings.append((time.perf_counter() - start) * 1000)
+        calls += 1
+
+    tracemalloc.start()
+    try:
+        func(calls)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "max_ms": max(timings),
+        "peak_kib": peak / 1024,
+    }
+
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINES_DIR, name + ".json")
+
+
+def save_baseline(name: str, results: Dict[str, Dict[str, float]]) -> str:
+    """Stores the results under `name`, along with the machine they were
+    measured on. Returns the path of the baseline."""
+    os.makedirs(BASELINES_DIR, exist_ok=True)
+    path = baseline_path(name)
+    with open(path, "w") as f:
+        json.dump({"machine": _machine(), "results": results}, f, indent=2,
+                  sort_keys=True)
+        f.write("\n")
+    return path
+
+
+def load_baseline(name: str) -> Dict:
+    with open(baseline_path(name)) as f:
+        return json.load(f)
+
+
+def compare(baseline: Dict, results: Dict[str, Dict[str, float]],
+            max_regression: float = 0.1) -> List[str]:
+    """Returns a report comparing `results` against a stored `baseline`,
+    flagging benchmarks whose median time or peak memory grew by more than
+    `max_regression`, as a fraction of the baseline."""
+    lines = []
+    if baseline["machine"] != _machine():
+        lines.append("WARNING: baseline was measured on %s"
+                     % baseline["machine"])
+    lines.append("%-46s %12s %12s %8s %10s" % (
+        "benchmark", "baseline ms", "current ms", "change", "memory"))
+    for name, current in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            lines.append("%-46s %12s %12.2f %8s %10s" % (
+                name, "-", current["median_ms"], "new", "-"))
+            continue
+        time_change = _change(before["median_ms"], current["median_ms"])
+        memory_change = _change(before["peak_kib"], current["peak_kib"])
+        flags = []
+        if time_change is not None and time_change > max_regression:
+            flags.append("SLOWER")
+        if memory_change is not None and memory_change > max_regression:
+            flags.append("MORE MEMORY")
+        lines.append(("%-46s %12.2f %12.2f %8s %10s %s" % (
+            name, before["median_ms"], current["median_ms"],
+            _format_change(time_change), _format_change(memory_change),
+            " ".join(flags))).rstrip())
+    return lines
+
+
+def has_regressions(report: List[str]) -> bool:
+    return any(line.endswith(("SLOWER", "MEMORY")) for line in report)
+
+
+def _change(before: float, after: float) -> Optional[float]:
+    if not before:
+        return None
+    return (after - before) / before
+
+
+def _format_change(change: Optional[float]) -> str:
+    return "-" if change is None else "%+.1f%%" % (change * 100)
+
+
+def _machine() -> str:
+    return "%s, %s, Python %s" % (platform.machine(), platform.processor()
+                                  or platform.system(),
+                                  platform.python_version())